@@ -1,19 +1,14 @@
 import os
 from dotenv import load_dotenv; load_dotenv() # Load .env immediately
-import re  # ADDED: For parsing reasoning blocks
 # REMOVED: import pam
-import httpx
-import tomllib
-import subprocess
-import random
 import time
 import streamlit as st
-from datetime import datetime
 
 # --- CORE IMPORTS ---
 from app_utils import (
     db, sidebar, ui_layout, bridge, 
-    extraction, consensus, auth, battle_royale, arena, web_search, memory
+    extraction, consensus, auth, arena, web_search, memory, telemetry,
+    render_cache, network, context_sizing, summarizer, recall, doc_index
 )
 
 from app_utils.sidebar_utils import loaders
@@ -60,9 +55,7 @@ st.markdown("""
 
 # --- ART INJECTION ---
 try:
-    with open(os.path.join("app_utils", "art.toml"), "rb") as f:
-        art_pack = tomllib.load(f)
-    selected_art = art_pack.get("radioactive", "")
+    selected_art = loaders.load_art().get("radioactive", "")
     st.markdown(f"""
     <div style='position: fixed; top: 50%; left: 50%; transform: translate(-50%, -50%); 
                 opacity: 0.08; 
@@ -111,14 +104,14 @@ if not st.session_state.authenticated:
     st.stop()
 
 # --- INIT SIDEBAR & CONFIG ---
-if "name_pool" not in st.session_state:
-    st.session_state.name_pool = loaders.load_names()
-
 client = bridge.get_client()
 user_key = st.session_state.username
 
 # Render Sidebar (returns config dict)
-config = sidebar.render(name_pool=st.session_state.name_pool)
+try: user_role = db.get_user_role(user_key)
+except Exception: user_role = "user"
+
+config = sidebar.render(name_pool=loaders.load_names(), role=user_role)
 
 # --- EMERGENCY LAYOUT RESET ---
 # This wipes browser local storage to fix a "vanished" sidebar
@@ -129,28 +122,31 @@ with st.sidebar:
 
 # Admin Check
 try:
-    if db.get_user_role(user_key) == "admin":
+    if user_role == "admin":
         admin_ui.render()
 except Exception: pass
 
 # --- GPU HUD FRAGMENT ---
+# Reads the shared telemetry snapshot; the sampler thread is the only thing touching the GPU driver.
 @st.fragment(run_every=1)
 def render_gpu_status():
     st.divider()
     try:
-        cmd = "nvidia-smi --query-gpu=name,temperature.gpu,utilization.gpu,memory.used,memory.total --format=csv,noheader,nounits"
-        output = subprocess.check_output(cmd.split()).decode("utf-8").strip().split("\n")
+        sampler = telemetry.get_sampler()
+        snapshot = sampler.latest() if sampler else None
+        if not snapshot: return
         st.markdown("### 🖥️ System Hardware")
-        for i, line in enumerate(output):
-            parts = [x.strip() for x in line.split(',')]
-            if len(parts) == 5:
-                name, temp, load, mem_used, mem_total = parts
-                with st.container(border=True):
-                    st.markdown(f"**GPU {i}: {name.replace('NVIDIA ', '')}**")
-                    c1, c2 = st.columns(2)
-                    c1.metric("Temp", f"{temp}°C")
-                    c2.metric("Load", f"{load}%")
-                    st.progress(int(mem_used)/int(mem_total), text=f"VRAM: {mem_used}/{mem_total}MB")
+        for i, gpu in enumerate(snapshot["gpus"]):
+            mem_used, mem_total = gpu["mem_used"], gpu["mem_total"]
+            with st.container(border=True):
+                st.markdown(f"**GPU {i}: {gpu['name'].replace('NVIDIA ', '')}**")
+                c1, c2 = st.columns(2)
+                c1.metric("Temp", f"{gpu['temp']}°C")
+                c2.metric("Load", f"{gpu['load']}%")
+                st.progress(mem_used / mem_total if mem_total else 0, text=f"VRAM: {mem_used}/{mem_total}MB")
+                vram_spark = telemetry.sparkline(sampler.series(i, "mem_used"), lo=0, hi=mem_total)
+                load_spark = telemetry.sparkline(sampler.series(i, "load"), lo=0, hi=100)
+                st.caption(f"VRAM `{vram_spark}`  \nLoad `{load_spark}`")
     except Exception: pass
 
 with st.sidebar:
@@ -162,44 +158,90 @@ st.title(f"RabidUI: {current_ws}")
 
 session_namespace = f"{current_ws}_{user_key}"
 if "messages" not in st.session_state or st.session_state.get("last_session") != session_namespace:
-    st.session_state.messages = db.load_history(session_namespace)
+    st.session_state.messages = render_cache.prepare_all(db.load_history(session_namespace))
     st.session_state.last_session = session_namespace
 
-# Render messages with <think> tag support
-for msg in st.session_state.messages:
-    with st.chat_message(msg["role"]): 
-        content = msg["content"]
-        if "<think>" in content:
-            match = re.search(r"<think>(.*?)</think>", content, re.DOTALL)
-            if match:
-                reasoning = match.group(1).strip()
-                final_response = re.sub(r"<think>.*?</think>", "", content, flags=re.DOTALL).strip()
-                with st.expander("💭 Reasoning Process", expanded=False):
-                    st.markdown(reasoning)
-                st.markdown(final_response, unsafe_allow_html=True)
-            else: st.markdown(content, unsafe_allow_html=True)
-        else: st.markdown(content, unsafe_allow_html=True)
+def render_parsed(parsed):
+    """Draws a pre-parsed message: reasoning, body, then collapsible report sections."""
+    if parsed["reasoning"]:
+        with st.expander("💭 Reasoning Process", expanded=False):
+            st.markdown(parsed["reasoning"])
+    st.markdown(parsed["body"], unsafe_allow_html=True)
+    for section in parsed["sections"]:
+        with st.expander(section["title"], expanded=False):
+            st.markdown(section["body"], unsafe_allow_html=True)
+
+def compile_intel(intel, sharded):
+    """WEB INTELLIGENCE block plus, for sharded turns, the source pool agents are dealt from."""
+    web_context = web_search.format_report(intel)
+    pool = web_search.build_pool(intel, num_results=web_search.SHARD_POOL_SIZE)[0] if sharded else []
+    return web_context, pool
+
+def await_late_reads(intel):
+    """Waits (up to the turn's search deadline) for deep reads still in flight; returns how many landed with content."""
+    def usable():
+        # Same test as web_search.build_pool: scraper failures come back as "[System: ...]" strings
+        return {u for u, text in intel["scraped"].items() if text and not text.startswith("[System")}
+
+    before = usable()
+    while intel["pending"] and web_search.refresh(intel, timeout=intel["deadline"] - time.time()):
+        pass
+    return len(usable() - before)
+
+def refinement_query(prompt, draft):
+    """Query for the single-agent refinement pass: revise a snippet-only draft against late deep reads."""
+    return (
+        f"{prompt}\n\n--- YOUR DRAFT ANSWER (written from search snippets only) ---\n{draft}\n--- END DRAFT ---\n"
+        "Full page content from deep reads has since arrived in the web intelligence above. "
+        "Revise the draft: keep what still holds, correct or extend it where the new sources say more. "
+        "Reply with the complete revised answer only."
+    )
+
+# Render messages from the parse cache; older turns stay collapsed until opened
+recent_start = max(0, len(st.session_state.messages) - render_cache.RECENT_TURNS)
+for idx, msg in enumerate(st.session_state.messages):
+    parsed = render_cache.prepare(msg)
+    with st.chat_message(msg["role"]):
+        if idx >= recent_start:
+            render_parsed(parsed)
+        else:
+            st.caption(parsed["preview"] or "…")
+            if st.toggle("Show full message", key=f"msg_open_{session_namespace}_{idx}"):
+                render_parsed(parsed)
 
 # --- INPUT AREA ---
 with st.popover("📎 Attach Files", use_container_width=False):
     uploaded_files = st.file_uploader(
-        "Upload context (PDF, TXT, MD, Images)", 
+        "Upload context (PDF, ZIP, TXT, MD, Images)", 
         accept_multiple_files=True,
-        type=['txt', 'pdf', 'md', 'png', 'jpg', 'jpeg']
+        type=['txt', 'pdf', 'zip', 'md', 'py', 'log', 'png', 'jpg', 'jpeg']
     )
 
 if prompt := st.chat_input("Input command..."):
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    db.save_message(session_namespace, user_key, "user", prompt)
+    user_msg_id = db.save_message(session_namespace, user_key, "user", prompt)
+    st.session_state.messages.append(render_cache.make_message("user", prompt, user_msg_id))
     with st.chat_message("user"): st.markdown(prompt)
 
     with st.chat_message("assistant"):
         status = st.status("☢️ Initializing Agents...", expanded=True)
-        file_context, _ = extraction.process_uploads(uploaded_files or [], user_key=user_key)
+        # Large archives/PDFs report their progress in the status label, which is reset afterwards
+        try:
+            documents, _ = extraction.extract_documents(
+                uploaded_files or [], user_key=user_key, progress=lambda msg: status.update(label=msg)
+            )
+        except Exception as e:
+            documents = []
+            status.write(f"⚠️ Attached files could not be read: {e}")
+        status.update(label="☢️ Initializing Agents...")
+        # Uploads are chunked and indexed once per session; only the chunks that match this query are sent
+        file_context = doc_index.get_index(session_namespace, documents).context_for(prompt) if documents else ""
         response_data = []
-        history_block = memory.get_short_term_memory(st.session_state.messages)
 
         web_context = ""
+        web_pool = []
+        intel, prefetch_box = None, None
+        pipelined = config.get("pipelined", False)
+        sharded = config.get("context_mode") == "Sharded" and config['consensus_mode'] != "None"
         if config.get("web_search", True):
             try:
                 # Use the first model in the config as the reasoning engine for search
@@ -208,41 +250,126 @@ if prompt := st.chat_input("Input command..."):
                     m = config["models"][0]
                     search_model = m.get('model') if isinstance(m, dict) else m
 
-                web_context = web_search.search(
-                    prompt, 
-                    client=client, 
-                    history=st.session_state.messages,
-                    model=search_model
-                )
+                try:
+                    # Pipelined: return with snippets, deep reads keep landing in the background
+                    intel = web_search.gather(
+                        prompt, 
+                        client=client, 
+                        history=st.session_state.messages,
+                        model=search_model,
+                        wait=not pipelined
+                    )
+                    web_context, web_pool = compile_intel(intel, sharded)
+                except Exception as e:
+                    web_context = f"[System Error]: Web search subsystem failed. Reason: {e}"
                 with st.expander("🕵️ Search Prefetch", expanded=False):
-                    st.text(web_context)
+                    prefetch_box = st.empty()
+                prefetch_box.text(web_context)
             except Exception: pass
 
+        # Rolling summary of turns older than the raw history tail (kept current in the background)
+        try:
+            session_summary = db.get_summary(session_namespace)
+        except Exception:
+            session_summary = None
+
+        # Semantic recall: earlier exchanges relevant to this query that fell out of the raw tail
+        try:
+            recalled = recall.format_recall(recall.search(session_namespace, prompt, skip_recent=summarizer.RAW_TAIL // 2))
+        except Exception:
+            recalled = ""
+
         active_models = config.get("models", [{"name": "Gemma 3", "model": "gemma3:27b"}])
         total_models = len(active_models)
+        tag = None  # Last agent's model; also the summarizer's fallback
         
         for i, agent in enumerate(active_models):
             tag = agent.get('model', agent) if isinstance(agent, dict) else agent
             name = agent.get('name', f"Agent {i}") if isinstance(agent, dict) else f"Agent {i}"
             try:
-                full_p = memory.build_final_prompt(config['system_prompt'], history_block, web_context, file_context, prompt, config.get('reasoning_mode', False))
+                # Pipelined: deep reads that landed while earlier agents ran are injected before this one starts
+                evidence_note = None
+                if intel and pipelined:
+                    if intel["pending"] and web_search.refresh(intel):
+                        web_context, web_pool = compile_intel(intel, sharded)
+                        prefetch_box.text(web_context)
+                    reads = len(intel["scraped"]) + len(intel["pending"])
+                    evidence_note = f"📡 Started with {len(intel['scraped'])}/{reads} deep reads"
+
+                # Sharded distribution: each agent reads a seed-determined slice of the source pool
+                agent_web, shard_note = web_context, None
+                if web_pool:
+                    seed = agent.get('seed', i) if isinstance(agent, dict) else i
+                    shard_ctx, shard_note = network.get_sharded_context(
+                        web_pool, seed, limit=config.get('shard_size', 4), overlap=config.get('shard_overlap', 1)
+                    )
+                    agent_web = f"--- WEB INTELLIGENCE SHARD (seed {seed}) ---\n{shard_ctx}\n--- END WEB INTELLIGENCE ---\n"
+
+                full_p, trimmed = memory.assemble_prompt(
+                    config['system_prompt'], st.session_state.messages, agent_web, file_context, prompt,
+                    model=tag, budget=config.get('prompt_budget', memory.PROMPT_BUDGET),
+                    reasoning_mode=config.get('reasoning_mode', False), summary=session_summary,
+                    recalled=recalled
+                )
+                if trimmed:
+                    status.write(f"✂️ {name}: {memory.format_trim_report(trimmed)}")
                 
                 if config['consensus_mode'] == "None":
-                    res_stream = client.chat(model=tag, messages=[{'role': 'user', 'content': full_p}], stream=True)
+                    res_stream = client.chat(
+                        model=tag, messages=[{'role': 'user', 'content': full_p}], stream=True,
+                        options=context_sizing.options_for(tag, full_p, memory.RESPONSE_RESERVE)
+                    )
                     full_text = st.write_stream(chunk['message']['content'] for chunk in res_stream)
-                    db.save_message(session_namespace, tag, "assistant", full_text)
-                    st.session_state.messages.append({"role": "assistant", "content": full_text})
+
+                    # Pipelined single agent: the draft ran on snippets, so deep reads that land
+                    # before the search deadline feed a refinement pass that replaces it
+                    if intel and pipelined and intel["pending"]:
+                        with st.spinner("📡 Waiting for deep reads to refine the answer..."):
+                            landed = await_late_reads(intel)
+                        if landed:
+                            web_context, _ = compile_intel(intel, sharded)
+                            prefetch_box.text(web_context)
+                            refine_p, _ = memory.assemble_prompt(
+                                config['system_prompt'], st.session_state.messages, web_context, file_context,
+                                refinement_query(prompt, full_text), model=tag,
+                                budget=config.get('prompt_budget', memory.PROMPT_BUDGET),
+                                reasoning_mode=config.get('reasoning_mode', False), summary=session_summary,
+                                recalled=recalled
+                            )
+                            st.caption(f"🔁 Refined with {landed} late deep read{'s' if landed > 1 else ''}")
+                            refine_stream = client.chat(
+                                model=tag, messages=[{'role': 'user', 'content': refine_p}], stream=True,
+                                options=context_sizing.options_for(tag, refine_p, memory.RESPONSE_RESERVE)
+                            )
+                            draft = full_text
+                            full_text = st.write_stream(chunk['message']['content'] for chunk in refine_stream)
+                            full_text += f"\n\n<details>\n<summary>📝 First draft (snippets only)</summary>\n\n{draft}\n</details>\n"
+
+                    msg_id = db.save_message(session_namespace, tag, "assistant", full_text)
+                    st.session_state.messages.append(render_cache.make_message("assistant", full_text, msg_id))
+                    summarizer.schedule_update(client, session_namespace, fallback_model=tag)
                     break 
                 else:
                     # STREAMING for Consensus Candidates
-                    res_stream = client.chat(model=tag, messages=[{'role': 'user', 'content': full_p}], stream=True)
+                    res_stream = client.chat(
+                        model=tag, messages=[{'role': 'user', 'content': full_p}], stream=True,
+                        options=context_sizing.options_for(tag, full_p, memory.RESPONSE_RESERVE)
+                    )
                     with st.expander(f"📄 {name} Response", expanded=True):
+                        if shard_note:
+                            st.caption(f"🧩 Evidence shard: {shard_note}")
+                        if evidence_note:
+                            st.caption(evidence_note)
                         full_content = st.write_stream(chunk['message']['content'] for chunk in res_stream)
                     
-                    response_data.append({'name': name, 'model': tag, 'content': full_content})
+                    response_data.append({'name': name, 'model': tag, 'content': full_content, 'shard': shard_note})
 
             except Exception as e: st.error(f"Error: {e}")
 
+        # Pipelined: let the prefetch view catch up with reads that landed during the last agent
+        if intel and pipelined and web_search.refresh(intel):
+            prefetch_box.text(compile_intel(intel, sharded)[0])
+
         if response_data and config['consensus_mode'] != "None":
             final_text, source, logs, survivors = consensus.run_decision_system(config['consensus_mode'], response_data, prompt, client, config.get('judge_model'), status_container=status)
 
@@ -258,14 +385,16 @@ if prompt := st.chat_input("Input command..."):
             for agent in response_data:
                 # Sanitize content slightly to prevent breaking HTML
                 safe_content = agent['content'].replace("$", "&#36;") 
-                history_text += f"\n<details>\n<summary>📄 {agent['name']} ({agent['model']})</summary>\n\n{safe_content}\n</details>\n"
+                shard_label = f" · 🧩 {agent['shard']}" if agent.get('shard') else ""
+                history_text += f"\n<details>\n<summary>📄 {agent['name']} ({agent['model']}){shard_label}</summary>\n\n{safe_content}\n</details>\n"
 
             # RENDER & SAVE
             with st.container(border=True):
                 st.markdown(history_text, unsafe_allow_html=True)
             
-            db.save_message(session_namespace, "Consensus", "assistant", history_text)
-            st.session_state.messages.append({"role": "assistant", "content": history_text})
+            msg_id = db.save_message(session_namespace, "Consensus", "assistant", history_text)
+            st.session_state.messages.append(render_cache.make_message("assistant", history_text, msg_id))
+            summarizer.schedule_update(client, session_namespace, fallback_model=tag)
             
             # 🍵 GRACEFUL REMOVAL: Update Workspace Config
             if survivors is not None:
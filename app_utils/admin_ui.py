@@ -2,24 +2,18 @@ import streamlit as st
 import subprocess
 import time
 import os
-import sqlite3
-import pandas as pd
 
 # REMOVED top-level import to prevent circular crash
 
-SCRAPER_DB_PATH = "/opt/rabid-scrape/scrapes.db"
-
 def get_scrapes(limit=50):
     """Fetches recent scrapes from the central database."""
-    if not os.path.exists(SCRAPER_DB_PATH):
-        return []
+    import pandas as pd
+    from app_utils import scrape_cache
+
     try:
-        # Open in Read-Only mode to be safe
-        conn = sqlite3.connect(f"file:{SCRAPER_DB_PATH}?mode=ro", uri=True)
-        query = "SELECT id, url, method, content, timestamp FROM scrapes ORDER BY timestamp DESC LIMIT ?"
-        df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
-        return df
+        # Shares the pooled read-only connection used by web search
+        rows = scrape_cache.recent(limit)
+        return pd.DataFrame(rows, columns=["id", "url", "method", "content", "timestamp"])
     except Exception as e:
         st.error(f"Database Error: {e}")
         return pd.DataFrame()
@@ -137,7 +131,7 @@ def render():
     st.sidebar.divider()
     with st.sidebar.expander("🛡️ Admin Console", expanded=False):
         
-        tab_users, tab_models, tab_shell, tab_scraper = st.tabs(["👥 Users", "🧠 Fleet", "💻 Shell", "👁️ Scraper"])
+        tab_users, tab_models, tab_shell, tab_scraper, tab_cache = st.tabs(["👥 Users", "🧠 Fleet", "💻 Shell", "👁️ Scraper", "📦 Cache"])
 
         # --- TAB 1: USER MANAGEMENT ---
         with tab_users:
@@ -186,7 +180,10 @@ def render():
             with st.popover("⬇️ Pull New Model", use_container_width=True):
                 new_model = st.text_input("Model Tag (e.g. llama3:8b)")
                 if st.button("Start Pull", use_container_width=True):
-                    if new_model:
+                    from app_utils import config_loader
+                    if new_model and not config_loader.is_model_allowed(new_model, "admin"):
+                        st.error(f"🚫 {new_model} matches a forbidden pattern in the model policy.")
+                    elif new_model:
                         status_box = st.empty()
                         try:
                             process = subprocess.Popen(
@@ -247,6 +244,30 @@ def render():
             else:
                 st.info("No scrapes found in database.")
 
+        # --- TAB 5: SEARCH CACHE ---
+        with tab_cache:
+            from app_utils import search_cache
+            st.caption("SearXNG response cache")
+            stats = search_cache.get_stats()
+            c1, c2 = st.columns(2)
+            c1.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+            c2.metric("Entries", stats["entries"])
+            st.caption(f"Hits: {stats['hits']} · Misses: {stats['misses']} · TTL: {search_cache.TTL_SECONDS}s")
+            if st.button("🧹 Clear Search Cache", use_container_width=True):
+                search_cache.clear()
+                st.rerun()
+
+            from app_utils import upload_cache
+            st.divider()
+            st.caption("Upload extraction cache (text / OCR by content hash)")
+            up_stats = upload_cache.get_stats()
+            u1, u2 = st.columns(2)
+            u1.metric("Entries", up_stats["entries"])
+            u2.metric("Size", f"{up_stats['bytes'] / 1048576:.1f} / {up_stats['max_bytes'] / 1048576:.0f} MB")
+            if st.button("🧹 Clear Upload Cache", use_container_width=True):
+                upload_cache.evict(max_bytes=0)
+                st.rerun()
+
     # --- RENDER MODAL IF STATE IS TRUE ---
     # This check happens on every run, keeping the window open
     if st.session_state.show_terminal:
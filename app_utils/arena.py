@@ -1,6 +1,7 @@
 import streamlit as st
 import time
-import plotly.graph_objects as go
+
+# plotly is imported inside the renderers: it costs ~1s at startup and only consensus turns draw charts
 
 def _get_lounge_theme():
     """Returns consistent color mapping for the Mahogany Lounge theme."""
@@ -18,6 +19,8 @@ def render_ranked_choice_rounds(round_tallies):
         st.warning("⚠️ No voting data available for runoff visualization.")
         return
 
+    import plotly.graph_objects as go
+
     theme = _get_lounge_theme()
     st.markdown("### 🗳️ Voting Runoff Analysis")
     
@@ -58,6 +61,8 @@ def render_ranked_choice_rounds(round_tallies):
 
 def render_battle(candidate_names, logs, winner_name):
     """Renders the animated Retirement Lounge status indicators."""
+    import plotly.graph_objects as go
+
     theme = _get_lounge_theme()
     
     st.markdown("""
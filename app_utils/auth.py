@@ -1,7 +1,6 @@
 import os
-import pam
-import httpx
 import streamlit as st
+from app_utils import http_pool
 from subprocess import check_output
 
 # --- CONFIGURATION (Loaded via systemd/EnvironmentFile) ---
@@ -13,6 +12,8 @@ REDIRECT_URI = os.environ.get("REDIRECT_URI", "http://localhost:8501")
 # 1. LOCAL SYSTEM AUTH (PAM)
 def login(username, password):
     """Authenticates against local Linux users."""
+    import pam  # Only the PAM login path needs the C bindings
+
     p = pam.pam()
     return p.authenticate(username, password)
 
@@ -38,33 +39,37 @@ def authenticate_github(code):
         "User-Agent": "RabidUI-Production-Server" 
     }
 
-    with httpx.Client(timeout=10.0) as client:
-        # STEP A: Exchange code for Access Token
-        token_res = client.post(
-            "https://github.com/login/oauth/access_token",
-            data={
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-                "code": code,
-                "redirect_uri": REDIRECT_URI
-            },
-            headers=headers
-        )
-        
-        # Guard against non-JSON responses from misconfigured DDNS/Gateways
-        if "application/json" not in token_res.headers.get("Content-Type", "").lower():
-            raise ConnectionError(f"GitHub returned non-JSON. Status: {token_res.status_code}")
+    # STEP A: Exchange code for Access Token (codes are single-use: never retried)
+    token_res = http_pool.post(
+        "https://github.com/login/oauth/access_token",
+        data={
+            "client_id": CLIENT_ID,
+            "client_secret": CLIENT_SECRET,
+            "code": code,
+            "redirect_uri": REDIRECT_URI
+        },
+        headers=headers,
+        timeout=10.0,
+        retries=0,
+        polite=False
+    )
+    
+    # Guard against non-JSON responses from misconfigured DDNS/Gateways
+    if "application/json" not in token_res.headers.get("Content-Type", "").lower():
+        raise ConnectionError(f"GitHub returned non-JSON. Status: {token_res.status_code}")
 
-        token_data = token_res.json()
-        token = token_data.get("access_token")
-        
-        if not token:
-            error_desc = token_data.get("error_description", "Invalid Code or Secret")
-            raise ConnectionError(f"GitHub Auth Error: {error_desc}")
+    token_data = token_res.json()
+    token = token_data.get("access_token")
+    
+    if not token:
+        error_desc = token_data.get("error_description", "Invalid Code or Secret")
+        raise ConnectionError(f"GitHub Auth Error: {error_desc}")
 
-        # STEP B: Fetch Profile Data using the token
-        user_res = client.get(
-            "https://api.github.com/user", 
-            headers={"Authorization": f"token {token}", "User-Agent": "RabidUI"}
-        )
-        return user_res.json()
\ No newline at end of file
+    # STEP B: Fetch Profile Data using the token
+    user_res = http_pool.get(
+        "https://api.github.com/user", 
+        headers={"Authorization": f"token {token}", "User-Agent": "RabidUI"},
+        timeout=10.0,
+        polite=False
+    )
+    return user_res.json()
\ No newline at end of file
@@ -1,30 +1,135 @@
 import yaml
 import os
+import re
+import fnmatch
+import threading
 
 POLICY_PATH = "/opt/rabid-ui/config/model_policy.yaml"
+DEFAULT_POLICY = {"forbidden_patterns": [], "roles": {"user": []}}
+
+GLOB_CHARS = set("*?[")
 
 def load_model_policy():
     """Loads the filtering rules from the YAML config."""
     if not os.path.exists(POLICY_PATH):
-        return {"forbidden_patterns": [], "roles": {"user": []}}
-    
+        return DEFAULT_POLICY
+
     with open(POLICY_PATH, 'r') as f:
-        return yaml.safe_load(f)
+        return yaml.safe_load(f) or DEFAULT_POLICY
+
+# --- PATTERN COMPILATION ---
+# Pattern syntax (same for forbidden lists and role whitelists):
+#   "re:<regex>"  -> regular expression (searched, case-insensitive)
+#   "llama3*"     -> glob against the full tag
+#   "vision"      -> plain string: substring for forbidden, exact tag for whitelists (legacy behaviour)
+
+def _pattern_to_regex(pattern, plain_is_substring):
+    pattern = str(pattern).strip()
+    if pattern.startswith("re:"):
+        return ".*?(?:" + pattern[3:] + ")"
+    if GLOB_CHARS & set(pattern):
+        return fnmatch.translate(pattern.lower())
+    if plain_is_substring:
+        return ".*" + re.escape(pattern.lower())
+    return re.escape(pattern.lower()) + r"\Z"
+
+def _compile(patterns, plain_is_substring):
+    """Folds a list of patterns into one alternation so each model costs a single regex match."""
+    if not patterns:
+        return None
+    parts = [f"(?:{_pattern_to_regex(p, plain_is_substring)})" for p in patterns]
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+class ModelPolicy:
+    """
+    A compiled model_policy.yaml. Roles may be a plain list (legacy) or a mapping:
+
+        roles:
+          user:  ["gemma2:9b", "llama3.1:*"]
+          power: {inherits: user, allow: ["re:^qwen2\\.5"]}
+    """
+
+    def __init__(self, raw):
+        raw = raw or {}
+        self.forbidden = _compile(raw.get("forbidden_patterns") or [], plain_is_substring=True)
+        self.raw_roles = raw.get("roles") or {}
+        self.roles = {}
+        self._results = {}
+
+    def _role_patterns(self, role, seen=None):
+        """Collects a role's allow-list including everything it inherits (cycles are ignored)."""
+        seen = seen or set()
+        if role in seen:
+            return []
+        seen.add(role)
+
+        spec = self.raw_roles.get(role, [])
+        if isinstance(spec, dict):
+            patterns = list(spec.get("allow") or [])
+            parents = spec.get("inherits") or []
+            if isinstance(parents, str):
+                parents = [parents]
+            for parent in parents:
+                patterns.extend(self._role_patterns(parent, seen))
+            return patterns
+        return list(spec or [])
+
+    def _role_matcher(self, role):
+        if role not in self.roles:
+            patterns = self._role_patterns(role)
+            # Admins bypass if whitelist is '*'
+            allow_all = "*" in patterns
+            self.roles[role] = (allow_all, None if allow_all else _compile(patterns, plain_is_substring=False))
+        return self.roles[role]
+
+    def is_allowed(self, model, role="user"):
+        """True if the model survives the global blacklist and the role's whitelist."""
+        if self.forbidden and self.forbidden.match(model):
+            return False
+        allow_all, matcher = self._role_matcher(role)
+        if allow_all:
+            return True
+        return bool(matcher and matcher.match(model))
+
+    def filter(self, raw_list, role="user"):
+        """Filters a model catalog, memoized per (catalog, role) since the catalog rarely changes."""
+        # Shared by every session thread: read and write once each, never re-read after storing
+        # (another session may clear() the memo in between)
+        key = (tuple(raw_list), role)
+        result = self._results.get(key)
+        if result is None:
+            result = [m for m in raw_list if self.is_allowed(m, role)]
+            if len(self._results) > 64:
+                self._results.clear()
+            self._results[key] = result
+        return list(result)
+
+# --- HOT RELOAD ---
+# The compiled policy is rebuilt only when the file's mtime changes; otherwise each call is one stat().
+_CACHE = {"mtime": None, "policy": None}
+_CACHE_LOCK = threading.Lock()
+
+def get_policy():
+    """Returns the compiled policy, recompiling if model_policy.yaml has been edited."""
+    try:
+        mtime = os.stat(POLICY_PATH).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    with _CACHE_LOCK:
+        if _CACHE["policy"] is None or _CACHE["mtime"] != mtime:
+            try:
+                raw = load_model_policy()
+            except (OSError, yaml.YAMLError):
+                raw = DEFAULT_POLICY
+            _CACHE["policy"] = ModelPolicy(raw)
+            _CACHE["mtime"] = mtime
+        return _CACHE["policy"]
 
 def filter_models(raw_list, role="user"):
     """Applies the YAML rules to a raw list of Ollama models."""
-    policy = load_model_policy()
-    forbidden = policy.get("forbidden_patterns", [])
-    role_whitelist = policy.get("roles", {}).get(role, [])
-
-    # 1. Remove forbidden patterns globally
-    clean_list = [
-        m for m in raw_list 
-        if not any(pattern in m.lower() for pattern in forbidden)
-    ]
-
-    # 2. Apply role-based whitelist (Admins bypass if whitelist is '*')
-    if "*" in role_whitelist:
-        return clean_list
-    
-    return [m for m in clean_list if m in role_whitelist]
+    return get_policy().filter(raw_list, role)
+
+def is_model_allowed(model, role="user"):
+    """Checks a single tag (squad adds, admin pulls) against the same policy."""
+    return get_policy().is_allowed(model, role)
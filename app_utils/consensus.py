@@ -1,7 +1,7 @@
 import streamlit as st
 import random
 import subprocess
-from app_utils import retirement_lounge, arena, ranked_choice
+from app_utils import retirement_lounge, arena, ranked_choice, context_sizing
 
 def retire_with_honors(losers_data, judge_model_tag):
     """
@@ -41,7 +41,7 @@ def summarize_victory(winning_text, prompt, client, model):
         response = client.chat(
             model=model,
             messages=[{'role': 'user', 'content': system_prompt}],
-            options={"temperature": 0.2}
+            options=context_sizing.options_for(model, system_prompt, options={"temperature": 0.2})
         )
         return response['message']['content']
     except Exception as e:
@@ -124,7 +124,7 @@ def run_decision_system(mode, response_data, prompt, client, judge_model=None, s
                 """
                 
                 try:
-                    res = client.chat(model=judge_model, messages=[{'role': 'user', 'content': judge_prompt}])
+                    res = client.chat(model=judge_model, messages=[{'role': 'user', 'content': judge_prompt}], options=context_sizing.options_for(judge_model, judge_prompt))
                     winning_text = res['message']['content']
                     winner_name = f"Curator {judge_model} (Synthesis)"
                     log(f"✅ Curator has synthesized a solution from the retirees.")
@@ -205,7 +205,7 @@ def run_decision_system(mode, response_data, prompt, client, judge_model=None, s
                 verdict_res = client.chat(
                     model=judge_model, 
                     messages=[{'role': 'user', 'content': verdict_prompt}],
-                    options=judge_opts
+                    options=context_sizing.options_for(judge_model, verdict_prompt, output_tokens=64, options=judge_opts)
                 )
                 verdict = verdict_res['message']['content'].strip().upper()
                 
@@ -213,7 +213,7 @@ def run_decision_system(mode, response_data, prompt, client, judge_model=None, s
                     log(f"✅ Judge **UPHOLDS** the Jury's decision ({jury_winner}).")
                     
                     final_prompt = f"Summarize and refine the winning answer from {jury_winner}.\n\nCONTENT:\n{next((r['content'] for r in response_data if r['name'] == jury_winner), '')}"
-                    res_stream = client.chat(model=judge_model, messages=[{'role': 'user', 'content': final_prompt}], stream=True)
+                    res_stream = client.chat(model=judge_model, messages=[{'role': 'user', 'content': final_prompt}], stream=True, options=context_sizing.options_for(judge_model, final_prompt))
                     final_text = st.write_stream(chunk['message']['content'] for chunk in res_stream)
                     return final_text, f"Verdict: {jury_winner} (Upheld)", "\n".join(log_entries), surviving_names
                 
@@ -227,7 +227,7 @@ def run_decision_system(mode, response_data, prompt, client, judge_model=None, s
                         log(f"⚖️ **SUPREME COURT RULING:** Judge {judge_model} issues binding verdict.")
                         
                         judge_final_prompt = f"The Jury is hung. You have final authority. Review all answers to '{prompt}' and generate the best possible response."
-                        res_stream = client.chat(model=judge_model, messages=[{'role': 'user', 'content': judge_final_prompt}], stream=True)
+                        res_stream = client.chat(model=judge_model, messages=[{'role': 'user', 'content': judge_final_prompt}], stream=True, options=context_sizing.options_for(judge_model, judge_final_prompt))
                         final_text = st.write_stream(chunk['message']['content'] for chunk in res_stream)
                         return final_text, f"Verdict: Judge Override", "\n".join(log_entries), surviving_names
 
@@ -244,7 +244,7 @@ def run_decision_system(mode, response_data, prompt, client, judge_model=None, s
         judge_prompt = f"USER QUERY: {prompt}\n\nAGENT RESPONSES:\n{context_block}\n\nINSTRUCTION: Act as a final judge. Synthesize the best answer or pick a winner."
         
         try:
-            res_stream = client.chat(model=judge_model, messages=[{'role': 'user', 'content': judge_prompt}], stream=True)
+            res_stream = client.chat(model=judge_model, messages=[{'role': 'user', 'content': judge_prompt}], stream=True, options=context_sizing.options_for(judge_model, judge_prompt))
             final_text = st.write_stream(chunk['message']['content'] for chunk in res_stream)
             return final_text, f"Judge Verdict ({judge_model})", "\n".join(log_entries), surviving_names
         except Exception as e:
@@ -0,0 +1,85 @@
+# /opt/rabid-ui/app_utils/context_sizing.py
+# Picks Ollama's num_ctx per request: measured prompt + expected output, rounded up to a bucket
+# (a changed num_ctx reloads the model, so values are kept to a small set) and capped by free VRAM.
+import os
+import re
+import threading
+import time
+from app_utils import tokens, telemetry
+
+# --- CONFIGURATION ---
+CTX_BUCKETS = [2048, 4096, 8192, 16384, 32768, 65536, 131072]
+DEFAULT_OUTPUT_TOKENS = 1024
+HEADROOM_MARGIN = 1.1   # Slack on the prompt estimate (it is a character heuristic, not a tokenizer)
+VRAM_RESERVE_MB = 1024  # Left free for other tenants of the GPU and allocator overhead
+STICKY_TURNS = 3        # Smaller requests a model rides out on its larger bucket before shrinking back
+KEEP_ALIVE_SECONDS = float(os.environ.get("OLLAMA_KEEP_ALIVE_SECONDS", "300"))  # Ollama unloads idle models after this
+
+# Rough fp16 KV-cache cost per 1k tokens of context by model size (billions of params -> MB).
+# GQA keeps this far below linear in size; these are upper-end values for common families.
+KV_MB_PER_1K_TOKENS = [(4, 64), (9, 128), (16, 192), (35, 256), (80, 320)]
+KV_MB_DEFAULT = 128
+
+SIZE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)b\b")
+
+_last_ctx = {}   # model -> (bucket, last used, consecutive requests that fit a smaller bucket)
+_lock = threading.Lock()
+
+def kv_mb_per_1k(model):
+    """KV-cache MB per 1k context tokens, from the parameter count in the tag ('qwen2.5:7b' -> 7)."""
+    match = SIZE_PATTERN.search(str(model).lower())
+    if not match:
+        return KV_MB_DEFAULT
+    size = float(match.group(1))
+    for max_size, mb in KV_MB_PER_1K_TOKENS:
+        if size <= max_size:
+            return mb
+    return KV_MB_PER_1K_TOKENS[-1][1]
+
+def vram_cap(model, loaded_ctx=None):
+    """
+    Largest context the free VRAM can hold for this model, or None if telemetry has no reading.
+    loaded_ctx: the bucket the model is loaded at right now; its KV cache counts as used VRAM
+    but is freed by the reload, so it is added back (otherwise the model caps itself below it).
+    """
+    headroom = telemetry.vram_headroom_mb()
+    if headroom is None:
+        return None
+    if loaded_ctx:
+        headroom += loaded_ctx / 1000 * kv_mb_per_1k(model)
+    # The model's current allocation is already counted as used, so the smallest bucket is always allowed
+    affordable = (headroom - VRAM_RESERVE_MB) / kv_mb_per_1k(model) * 1000 + CTX_BUCKETS[0]
+    return max(CTX_BUCKETS[0], int(affordable))
+
+def num_ctx_for(model, prompt_tokens, output_tokens=DEFAULT_OUTPUT_TOKENS):
+    """
+    Smallest bucket that fits prompt + output, never above the model's trained window or the VRAM cap.
+    A model keeps its previous, larger bucket for up to STICKY_TURNS smaller requests, so an odd
+    short turn doesn't trigger a reload; after that (or once Ollama has unloaded it) it shrinks back.
+    """
+    needed = int(prompt_tokens * HEADROOM_MARGIN) + output_tokens
+    now = time.time()
+    with _lock:
+        previous, used_at, smaller_runs = _last_ctx.get(model, (None, 0.0, 0))
+    loaded = now - used_at < KEEP_ALIVE_SECONDS
+
+    ceiling = tokens.context_window(model)
+    cap = vram_cap(model, previous if loaded else None)
+    if cap is not None:
+        ceiling = min(ceiling, cap)
+
+    allowed = [b for b in CTX_BUCKETS if b <= ceiling] or CTX_BUCKETS[:1]
+    choice = next((b for b in allowed if b >= needed), allowed[-1])
+
+    with _lock:
+        if previous and loaded and choice < previous <= allowed[-1] and smaller_runs < STICKY_TURNS:
+            _last_ctx[model] = (previous, now, smaller_runs + 1)
+            return previous
+        _last_ctx[model] = (choice, now, 0)
+    return choice
+
+def options_for(model, prompt, output_tokens=DEFAULT_OUTPUT_TOKENS, options=None):
+    """Copy of the chat options with num_ctx sized for this prompt."""
+    sized = dict(options or {})
+    sized["num_ctx"] = num_ctx_for(model, tokens.estimate(prompt, model), output_tokens)
+    return sized
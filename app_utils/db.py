@@ -1,9 +1,16 @@
 import sqlite3
 import os
+import time
 
 # Use the established deployment path for consistency
 DB_FILE = "/opt/rabid-ui/rabidui.db"
 
+# Fast-tier page text kept in fetch_cache (least recently checked pages are dropped past the cap)
+FETCH_CACHE_MAX_BYTES = int(float(os.environ.get("RABID_FETCH_CACHE_MB", "128")) * 1024 * 1024)
+FETCH_CACHE_MAX_CHARS = 200000   # Per page
+FETCH_PRUNE_EVERY = 50           # Saves between size checks
+_fetch_saves = 0
+
 def init_db():
     """Initializes messages, workspaces, and the new RBAC users table."""
     # Ensure directory exists for deployment
@@ -38,6 +45,31 @@ def init_db():
                 role TEXT DEFAULT 'awaiting'
             )
         """)
+        # 4. Fetch Tiers: which scrape tier a URL needs, plus fast-tier content
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS fetch_cache (
+                url_key TEXT PRIMARY KEY,
+                url TEXT,
+                tier TEXT,
+                reason TEXT,
+                content TEXT,
+                fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # 5. Rolling Summaries: one per session, covering its messages up to and including id 'covered_id'
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT,
+                covered_id INTEGER DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Freshness metadata (added after the table first shipped, so migrate in place)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(fetch_cache)")}
+        for column, decl in [("etag", "TEXT"), ("last_modified", "TEXT"), ("content_hash", "TEXT"), ("checked_at", "REAL")]:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE fetch_cache ADD COLUMN {column} {decl}")
         conn.commit()
 
 # --- RBAC / USER MANAGEMENT ---
@@ -100,6 +132,80 @@ def create_workspace(user_key, workspace_name):
         )
         conn.commit()
 
+# --- FETCH TIERS ---
+
+def get_fetch_records(url_keys):
+    """Fetches tier + freshness records for a batch of normalized URLs, keyed by url_key."""
+    if not url_keys:
+        return {}
+    init_db()
+    placeholders = ",".join("?" for _ in url_keys)
+    with sqlite3.connect(DB_FILE) as conn:
+        cursor = conn.execute(
+            f"SELECT url_key, tier, reason, content, etag, last_modified, content_hash, checked_at, fetched_at "
+            f"FROM fetch_cache WHERE url_key IN ({placeholders})",
+            tuple(url_keys)
+        )
+        return {
+            row[0]: {
+                "tier": row[1], "reason": row[2], "content": row[3],
+                "etag": row[4], "last_modified": row[5], "content_hash": row[6], "checked_at": row[7],
+                "fetched_at": row[8]
+            }
+            for row in cursor.fetchall()
+        }
+
+def save_fetch_record(url_key, url, tier, reason=None, content=None, validators=None):
+    """
+    Records the tier a URL needed ('http' or 'browser'), its distilled text (HTTP tier only)
+    and the validators used for conditional revalidation (etag, last_modified, content_hash).
+    """
+    global _fetch_saves
+    validators = validators or {}
+    if content:
+        content = content[:FETCH_CACHE_MAX_CHARS]
+    init_db()
+    with sqlite3.connect(DB_FILE) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO fetch_cache "
+            "(url_key, url, tier, reason, content, etag, last_modified, content_hash, checked_at, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+            (url_key, url, tier, reason, content,
+             validators.get("etag"), validators.get("last_modified"), validators.get("content_hash"),
+             time.time() if content else None)  # Browser records only turn fresh via touch_fetch_record
+        )
+        conn.commit()
+    _fetch_saves += 1
+    if content and _fetch_saves % FETCH_PRUNE_EVERY == 0:
+        prune_fetch_cache()
+
+def prune_fetch_cache(max_bytes=FETCH_CACHE_MAX_BYTES):
+    """Deletes the least recently checked fast-tier pages until their stored text fits max_bytes."""
+    init_db()
+    with sqlite3.connect(DB_FILE) as conn:
+        conn.execute(
+            "DELETE FROM fetch_cache WHERE url_key IN ("
+            " SELECT url_key FROM ("
+            "  SELECT url_key, SUM(LENGTH(content)) OVER (ORDER BY checked_at DESC, url_key) AS running"
+            "  FROM fetch_cache WHERE content IS NOT NULL"
+            " ) WHERE running > ?"
+            ")",
+            (max_bytes,)
+        )
+        conn.commit()
+
+def touch_fetch_record(url_key, validators=None):
+    """Marks a cached page as just revalidated (304 or unchanged hash), refreshing validators if sent."""
+    validators = validators or {}
+    init_db()
+    with sqlite3.connect(DB_FILE) as conn:
+        conn.execute(
+            "UPDATE fetch_cache SET checked_at = ?, "
+            "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url_key = ?",
+            (time.time(), validators.get("etag"), validators.get("last_modified"), url_key)
+        )
+        conn.commit()
+
 # --- MESSAGE LOGIC ---
 
 def load_history(session_id):
@@ -107,24 +213,58 @@ def load_history(session_id):
     init_db()
     with sqlite3.connect(DB_FILE) as conn:
         cursor = conn.execute(
-            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC", 
+            "SELECT id, role, content FROM messages WHERE session_id = ? ORDER BY id ASC", 
             (session_id,)
         )
-        return [{"role": row[0], "content": row[1]} for row in cursor.fetchall()]
+        return [{"id": row[0], "role": row[1], "content": row[2]} for row in cursor.fetchall()]
 
 def save_message(session_id, sender, role, content):
-    """Saves a single message."""
+    """Saves a single message and queues it for the session's semantic memory index."""
     init_db()
     with sqlite3.connect(DB_FILE) as conn:
-        conn.execute(
+        cursor = conn.execute(
             "INSERT INTO messages (session_id, sender, role, content) VALUES (?, ?, ?, ?)",
             (session_id, sender, role, content)
         )
         conn.commit()
+        message_id = cursor.lastrowid
+
+    from app_utils import recall  # Deferred: recall imports this module
+    recall.schedule_index(session_id, message_id, role, content)
+    return message_id
 
 def clear_history(session_id):
-    """Deletes all messages for a session."""
+    """Deletes all messages for a session (and the summary built from them)."""
     init_db()
     with sqlite3.connect(DB_FILE) as conn:
         conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM session_summaries WHERE session_id = ?", (session_id,))
+        conn.commit()
+
+    from app_utils import recall
+    recall.forget(session_id)
+
+# --- ROLLING SUMMARIES ---
+
+def get_summary(session_id):
+    """
+    Returns {"summary", "covered_id"} for a session (covered_id: id of the newest message the
+    summary includes), or None if nothing has been summarized yet.
+    """
+    init_db()
+    with sqlite3.connect(DB_FILE) as conn:
+        row = conn.execute(
+            "SELECT summary, covered_id FROM session_summaries WHERE session_id = ?", (session_id,)
+        ).fetchone()
+    return {"summary": row[0], "covered_id": row[1] or 0} if row else None
+
+def save_summary(session_id, summary, covered_id):
+    """Stores the rolling summary and the id of the newest message it covers."""
+    init_db()
+    with sqlite3.connect(DB_FILE) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO session_summaries (session_id, summary, covered_id, updated_at) "
+            "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+            (session_id, summary, covered_id)
+        )
         conn.commit()
\ No newline at end of file
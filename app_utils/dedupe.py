@@ -0,0 +1,68 @@
+# /opt/rabid-ui/app_utils/dedupe.py
+import hashlib
+import re
+
+# --- CONFIGURATION ---
+SHINGLE_SIZE = 3
+MAX_HAMMING = 5          # Fingerprints this close are the same page (mirror, syndication, tracking variant)
+MIN_SHINGLES = 12        # Below this simhash is noisy; short texts use Jaccard instead
+JACCARD_THRESHOLD = 0.8
+MAX_FINGERPRINT_CHARS = 50000  # Long pages are fingerprinted on their head; mirrors diverge early if at all
+
+WORD_PATTERN = re.compile(r"\w+")
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of word n-grams; texts shorter than n words become a single shingle."""
+    words = WORD_PATTERN.findall((text or "").lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(shingle_set):
+    """64-bit SimHash fingerprint of a shingle set."""
+    import numpy as np
+
+    hashes = np.fromiter((_hash64(sh) for sh in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    # One row of 64 bits per shingle; a fingerprint bit is set where most shingles agree
+    bits = np.unpackbits(hashes.byteswap().view(np.uint8).reshape(-1, 8), axis=1)
+    votes = bits.sum(axis=0) * 2 > len(shingle_set)
+    return int("".join("1" if v else "0" for v in votes), 2)
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class Fingerprint:
+    """Shingles + SimHash for one text, computed once and compared pairwise."""
+
+    def __init__(self, text):
+        self.shingles = shingles((text or "")[:MAX_FINGERPRINT_CHARS])
+        self.hash = simhash(self.shingles) if len(self.shingles) >= MIN_SHINGLES else None
+
+    def matches(self, other):
+        if not self.shingles or not other.shingles:
+            return False
+        if self.hash is not None and other.hash is not None:
+            return hamming(self.hash, other.hash) <= MAX_HAMMING
+        union = len(self.shingles | other.shingles)
+        return union > 0 and len(self.shingles & other.shingles) / union >= JACCARD_THRESHOLD
+
+def unique(items, text_of, limit=None):
+    """
+    Keeps the first of every group of near-duplicate items (input order = priority).
+    Returns (kept, dropped) where dropped is a list of (item, kept_item_it_duplicates).
+    """
+    kept, kept_prints, dropped = [], [], []
+    for item in items:
+        fp = Fingerprint(text_of(item))
+        twin = next((k for k, kp in zip(kept, kept_prints) if fp.matches(kp)), None)
+        if twin is not None:
+            dropped.append((item, twin))
+            continue
+        kept.append(item)
+        kept_prints.append(fp)
+        if limit and len(kept) >= limit:
+            break
+    return kept, dropped
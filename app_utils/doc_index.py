@@ -0,0 +1,156 @@
+# /opt/rabid-ui/app_utils/doc_index.py
+# Retrieval over uploaded files: documents are chunked along line boundaries, indexed once
+# per session (BM25, optionally fused with embeddings) and only the chunks that rank best
+# for the current query go into the prompt, each tagged with its source and line range.
+import os
+import threading
+from collections import OrderedDict
+from app_utils import passages, tokens
+
+# --- CONFIGURATION ---
+CHUNK_CHARS = 1200
+OVERLAP_LINES = 2           # Lines repeated at the head of the next chunk so statements aren't cut blind
+FILE_CONTEXT_TOKENS = 3000  # Chunk budget per turn (assemble_prompt may trim further)
+USE_EMBEDDINGS = os.environ.get("RABID_UPLOAD_EMBEDDINGS", "0") == "1"
+RRF_K = 60                  # Reciprocal-rank-fusion constant for BM25 + embedding rankings
+MAX_INDEXES = 32            # Session indexes kept in memory (LRU)
+MAX_CHUNKED_DOCS = 256      # Chunked documents kept by content hash (LRU), shared across sessions
+
+def chunk_document(source, text, label="DOC"):
+    """Splits one document into ~CHUNK_CHARS chunks: [{"source", "label", "start", "end", "text"}] (1-based lines)."""
+    lines = (text or "").split("\n")
+    chunks = []
+    start = 0
+    while start < len(lines):
+        end, size = start, 0
+        while end < len(lines) and (size == 0 or size + len(lines[end]) + 1 <= CHUNK_CHARS):
+            size += len(lines[end]) + 1
+            end += 1
+        body = "\n".join(lines[start:end]).strip()
+        if body:
+            chunks.append({"source": source, "label": label, "start": start + 1, "end": end, "text": body[:CHUNK_CHARS * 2]})
+        if end >= len(lines):
+            break
+        start = max(start + 1, end - OVERLAP_LINES)
+    return chunks
+
+_chunked = OrderedDict()
+_chunked_lock = threading.Lock()
+
+def chunks_for(doc):
+    """chunk_document, memoized by the document's content hash (extraction.extract_documents sets it)."""
+    if not doc.get("hash"):
+        return chunk_document(doc["name"], doc["text"], doc.get("kind", "DOC"))
+    key = (doc["hash"], doc["name"], doc.get("kind", "DOC"))
+    with _chunked_lock:
+        chunks = _chunked.get(key)
+        if chunks is not None:
+            _chunked.move_to_end(key)
+            return chunks
+    chunks = chunk_document(doc["name"], doc["text"], doc.get("kind", "DOC"))
+    with _chunked_lock:
+        _chunked[key] = chunks
+        while len(_chunked) > MAX_CHUNKED_DOCS:
+            _chunked.popitem(last=False)
+    return chunks
+
+def cite(chunk):
+    span = f"line {chunk['start']}" if chunk["start"] == chunk["end"] else f"lines {chunk['start']}-{chunk['end']}"
+    return f"{chunk['source']} · {span}"
+
+class UploadIndex:
+    """Chunks + BM25 (and, when enabled, embeddings) for one set of uploaded documents."""
+
+    def __init__(self, documents):
+        self.chunks = []
+        for doc in documents:
+            self.chunks.extend(chunks_for(doc))
+        self.bm25 = passages.BM25([c["text"] for c in self.chunks])
+        self.total_tokens = sum(tokens.estimate(c["text"]) for c in self.chunks)
+        self._vectors = None
+        self._lock = threading.Lock()
+
+    def _embedding_ranking(self, query):
+        import numpy as np
+        from app_utils import recall
+
+        with self._lock:
+            if self._vectors is None:
+                embedded = [recall.embed(c["text"]) for c in self.chunks]
+                self._vectors = {
+                    model: (np.array([i for i, (m, _) in enumerate(embedded) if m == model]),
+                            np.vstack([v for m, v in embedded if m == model]))
+                    for model in {m for m, _ in embedded}
+                }
+        scores = np.full(len(self.chunks), -1.0, dtype=np.float32)
+        for model, (rows, matrix) in self._vectors.items():
+            used, q = recall.embed(query, model)
+            if used == model:
+                scores[rows] = matrix @ q
+        return sorted(range(len(self.chunks)), key=lambda i: -scores[i])
+
+    def rank(self, query):
+        """
+        Chunk indices, best first. Lexically, only matching chunks are returned;
+        queries with no lexical overlap fall back to document order.
+        """
+        scores = self.bm25.scores(query or "")
+        lexical = sorted(range(len(self.chunks)), key=lambda i: (-scores[i], i))
+        if not USE_EMBEDDINGS:
+            matching = [i for i in lexical if scores[i] > 0]
+            return matching or lexical
+        try:
+            semantic = self._embedding_ranking(query)
+        except Exception:
+            return lexical
+        fused = {}
+        for ranking in (lexical, semantic):
+            for rank, i in enumerate(ranking):
+                fused[i] = fused.get(i, 0.0) + 1.0 / (RRF_K + rank)
+        return sorted(fused, key=lambda i: (-fused[i], i))
+
+    def context_for(self, query, budget_tokens=FILE_CONTEXT_TOKENS):
+        """USER UPLOADED FILES block: every chunk if the uploads fit, else the top-ranked ones with citations."""
+        if not self.chunks:
+            return ""
+        if self.total_tokens <= budget_tokens:
+            picked = list(range(len(self.chunks)))
+        else:
+            picked, used = [], 0
+            for i in self.rank(query):
+                cost = tokens.estimate(self.chunks[i]["text"])
+                if used + cost > budget_tokens:
+                    continue
+                picked.append(i)
+                used += cost
+
+        block = ""
+        if len(picked) < len(self.chunks):
+            block += f"[Retrieved {len(picked)} of {len(self.chunks)} chunks most relevant to the query; cite sources as given.]\n"
+        for i in picked:
+            chunk = self.chunks[i]
+            block += f"\n[{chunk['label']}: {cite(chunk)}]\n{chunk['text']}\n"
+        return block
+
+# --- PER-SESSION REGISTRY ---
+
+_indexes = OrderedDict()
+_registry_lock = threading.Lock()
+
+def _signature(documents):
+    return tuple((d["name"], d.get("hash") or hash(d["text"])) for d in documents)
+
+def get_index(session_id, documents):
+    """Returns the session's index for this exact upload set, building it on first use."""
+    key = (session_id, _signature(documents))
+    with _registry_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = UploadIndex(documents)
+    with _registry_lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -1,49 +1,186 @@
+import codecs
+import shutil
+import time
 import zipfile
 import os
-from PIL import Image
-import pytesseract
 import streamlit as st
+from app_utils import upload_cache, ocr, pdf_extract
 
 # Absolute path resolution for the Ubuntu host
 UPLOAD_BASE = os.path.join(os.path.dirname(__file__), "..", "user_data", "uploads")
 
-def process_uploads(uploaded_files, user_key="default"):
-    """Processes files and sandboxes them into user-specific directories."""
-    file_context = ""
+TEXT_EXTENSIONS = ('.txt', '.md', '.py', '.log')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Archive and text limits (bytes are counted as decompressed, so zip bombs stop at the cap)
+MAX_ARCHIVE_BYTES = int(float(os.environ.get("RABID_ARCHIVE_MAX_MB", "50")) * 1024 * 1024)
+MAX_ARCHIVE_MEMBERS = int(os.environ.get("RABID_ARCHIVE_MAX_FILES", "500"))
+MAX_DOC_BYTES = 5 * 1024 * 1024   # Per text file or archive member; the rest is cut off
+READ_CHUNK = 64 * 1024
+PROGRESS_INTERVAL = 0.5           # Seconds between progress updates
+
+def _throttled(progress):
+    """Wraps a progress callback so a long loop sends at most one update per PROGRESS_INTERVAL."""
+    if progress is None:
+        return lambda msg: None
+    last = [0.0]
+
+    def report(msg):
+        now = time.time()
+        if now - last[0] >= PROGRESS_INTERVAL:
+            last[0] = now
+            progress(msg)
+    return report
+
+def _read_text(stream, limit):
+    """Decodes up to limit bytes from a binary stream, READ_CHUNK at a time. Returns (text, bytes_read, truncated)."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parts, used = [], 0
+    while used < limit:
+        chunk = stream.read(min(READ_CHUNK, limit - used))
+        if not chunk:
+            return "".join(parts) + decoder.decode(b"", final=True), used, False
+        used += len(chunk)
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), used, bool(stream.read(1))
+
+def extract_zip(path, progress=None):
+    """Text members of an archive on disk, streamed one at a time within the archive caps."""
+    report = _throttled(progress)
+    docs, total, skipped, cut = [], 0, [], 0
+    with zipfile.ZipFile(path) as z:
+        members = [m for m in z.infolist() if not m.is_dir()]
+        for n, info in enumerate(members, 1):
+            if not info.filename.lower().endswith(TEXT_EXTENSIONS):
+                continue
+            if len(docs) >= MAX_ARCHIVE_MEMBERS or total >= MAX_ARCHIVE_BYTES:
+                skipped.append(info.filename)
+                continue
+            try:
+                with z.open(info) as member:
+                    text, used, truncated = _read_text(member, min(MAX_DOC_BYTES, MAX_ARCHIVE_BYTES - total))
+            except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+                # RuntimeError: encrypted member; NotImplementedError: unsupported compression
+                docs.append({"member": info.filename, "kind": "ZIP_NOTE", "text": f"[Member not read: {e}]"})
+                continue
+            total += used
+            cut += truncated
+            if truncated:
+                text += "\n[... truncated at the upload size limit]"
+            docs.append({"member": info.filename, "kind": "ZIP_DOC", "text": text})
+            report(f"🗜️ Reading archive: {n}/{len(members)} files, {total // 1024} KB")
+
+    if skipped or cut:
+        note = f"[Archive partially read: {len(skipped)} text files skipped, {cut} truncated "
+        note += f"(limits: {MAX_ARCHIVE_MEMBERS} files, {MAX_ARCHIVE_BYTES // (1024 * 1024)} MB)]"
+        docs.append({"member": None, "kind": "ZIP_NOTE", "text": note})
+    return docs
+
+def extract_file(name, path, progress=None):
+    """
+    Extracts the text of one upload saved at path (cacheable: depends only on name type and bytes).
+    Returns ([{"member", "kind", "text"}], ok); member is the path inside an archive or the PDF page,
+    else None. ok is False when extraction was cut short by a timeout or error (not worth caching).
+    """
+    docs, ok = [], True
+
+    # 2. Extract Text
+    if name.endswith(TEXT_EXTENSIONS):
+        with open(path, "rb") as f:
+            text, _, truncated = _read_text(f, MAX_DOC_BYTES)
+        if truncated:
+            text += "\n[... truncated at the upload size limit]"
+        docs.append({"member": None, "kind": "DOC", "text": text})
+
+    # 3. Handle ZIPs
+    elif name.endswith('.zip'):
+        try:
+            docs = extract_zip(path, progress)
+        except zipfile.BadZipFile as e:
+            docs.append({"member": None, "kind": "ZIP_NOTE", "text": f"[Archive not read: {e}]"})
+
+    # 4. Handle PDFs (text layer in parallel, OCR for scanned pages)
+    elif name.endswith('.pdf'):
+        docs, ok = pdf_extract.extract_pdf(path, _throttled(progress))
+
+    # 5. Handle Images (OCR Fallback)
+    elif name.endswith(IMAGE_EXTENSIONS):
+        with open(path, "rb") as f:
+            text, ok = ocr.ocr_images([f.read()])[0]
+        docs.append({"member": None, "kind": "IMAGE_OCR", "text": text})
+
+    return docs, ok
+
+def extract_documents(uploaded_files, user_key="default", progress=None):
+    """
+    Processes files and sandboxes them into user-specific directories.
+    Returns (documents, image_bytes_list); documents are [{"name", "kind", "text", "hash"}].
+    Extraction is cached by content hash, so files that stay attached are hashed (upload and saved copy), not re-read.
+    Uploads are copied to disk in chunks and archives/PDFs are read from there, never whole in memory.
+    progress (optional) receives short status strings while large files are being read.
+    """
+    documents = []
     image_bytes_list = []
-    
+    entries = []
+    ocr_jobs = []  # (slot in entries, digest, saved_path, bytes) for images not in the cache
+
     # 1. Create a private sandbox for this specific GitHub ID
     user_upload_path = os.path.join(UPLOAD_BASE, str(user_key))
     os.makedirs(user_upload_path, exist_ok=True)
-    
+
     for f in uploaded_files:
         name = f.name.lower()
-        
-        # Save a physical copy to the Ubuntu drive
+        digest = upload_cache.hash_stream(f)
+
+        # Save a physical copy to the Ubuntu drive (skipped when these exact bytes are already there)
         saved_path = os.path.join(user_upload_path, name)
-        with open(saved_path, "wb") as temp_file:
-            temp_file.write(f.getbuffer())
-
-        # 2. Extract Text
-        if name.endswith(('.txt', '.md', '.py', '.log')):
-            content = f.read().decode('utf-8', errors='ignore')
-            file_context += f"\n[DOC: {name}]\n{content}\n"
-            
-        # 3. Handle ZIPs
-        elif name.endswith('.zip'):
-            with zipfile.ZipFile(f) as z:
-                for zname in z.namelist():
-                    if zname.lower().endswith(('.txt', '.md', '.py', '.log')):
-                        with z.open(zname) as iz:
-                            content = iz.read().decode('utf-8', errors='ignore')
-                            file_context += f"\n[ZIP_DOC: {zname}]\n{content}\n"
-        
-        # 4. Handle Images (Vision + OCR Fallback)
-        elif name.endswith(('.png', '.jpg', '.jpeg')):
-            img_data = f.getvalue()
-            image_bytes_list.append(img_data)
-            img = Image.open(f)
-            ocr_text = pytesseract.image_to_string(img)
-            file_context += f"\n[IMAGE_OCR: {name}]\n{ocr_text}\n"
-            
-    return file_context, image_bytes_list
\ No newline at end of file
+        written = False
+        if not upload_cache.already_on_disk(digest, saved_path, f.size):
+            with open(saved_path, "wb") as temp_file:
+                shutil.copyfileobj(f, temp_file, READ_CHUNK)
+            f.seek(0)
+            written = True
+
+        data = None
+        if name.endswith(IMAGE_EXTENSIONS):
+            data = f.getvalue()
+            image_bytes_list.append(data)
+
+        entry = upload_cache.get(digest)
+        if entry is None and name.endswith(IMAGE_EXTENSIONS):
+            ocr_jobs.append((len(entries), digest, saved_path, data))
+        elif entry is None:
+            if progress:
+                progress(f"📎 Reading {f.name}...")
+            docs, ok = extract_file(name, saved_path, progress)
+            # Partial results (timeouts) are used this turn but not cached, so the next turn retries
+            entry = upload_cache.put(digest, docs, saved_path) if ok else {"docs": docs, "paths": []}
+        elif written:
+            upload_cache.record_path(digest, saved_path)
+        entries.append((name, digest, entry))
+
+    # 5b. All uncached images are OCR'd together in the process pool (tiles of big images in parallel too)
+    if ocr_jobs:
+        if progress:
+            progress(f"🔍 OCR of {len(ocr_jobs)} image{'s' if len(ocr_jobs) > 1 else ''}...")
+        results = ocr.ocr_images([job[3] for job in ocr_jobs])
+        for (slot, digest, saved_path, _), (text, ok) in zip(ocr_jobs, results):
+            docs = [{"member": None, "kind": "IMAGE_OCR", "text": text}]
+            entry = upload_cache.put(digest, docs, saved_path) if ok else {"docs": docs, "paths": []}
+            entries[slot] = (entries[slot][0], digest, entry)
+
+    for name, digest, entry in entries:
+        for doc in entry["docs"]:
+            doc_name = f"{name}/{doc['member']}" if doc["member"] else name
+            # Hash per document: the whole file's for single docs, member-qualified inside archives
+            doc_hash = f"{digest}:{doc['member']}" if doc["member"] else digest
+            documents.append({"name": doc_name, "kind": doc["kind"], "text": doc["text"], "hash": doc_hash})
+
+    return documents, image_bytes_list
+
+def process_uploads(uploaded_files, user_key="default"):
+    """Full text of every upload as one block (no retrieval); see doc_index for the ranked path."""
+    documents, image_bytes_list = extract_documents(uploaded_files, user_key)
+    file_context = "".join(f"\n[{d['kind']}: {d['name']}]\n{d['text']}\n" for d in documents)
+    return file_context, image_bytes_list
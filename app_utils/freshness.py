@@ -0,0 +1,60 @@
+# /opt/rabid-ui/app_utils/freshness.py
+import calendar
+import fnmatch
+import hashlib
+import os
+import time
+
+# --- CONFIGURATION ---
+DEFAULT_TTL = float(os.environ.get("RABID_SCRAPE_TTL", "86400"))  # Seconds a cached page is served without revalidation
+
+# Per-domain overrides, matched as globs against the host (first match wins).
+# Reference pages barely change; news and feeds go stale within the hour.
+DOMAIN_TTLS = [
+    ("*wikipedia.org", 7 * 86400),
+    ("docs.*", 7 * 86400),
+    ("*readthedocs.io", 7 * 86400),
+    ("*arxiv.org", 30 * 86400),
+    ("*github.com", 86400),
+    ("*stackoverflow.com", 3 * 86400),
+    ("*reddit.com", 3600),
+    ("news.*", 3600),
+    ("*cnn.com", 3600),
+    ("*bbc.co.uk", 3600),
+    ("*bbc.com", 3600),
+    ("*reuters.com", 3600),
+]
+
+def ttl_for(url):
+    """TTL in seconds for a URL, from the first DOMAIN_TTLS glob matching its host."""
+    from urllib.parse import urlsplit
+
+    host = (urlsplit(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    for pattern, ttl in DOMAIN_TTLS:
+        if fnmatch.fnmatch(host, pattern):
+            return ttl
+    return DEFAULT_TTL
+
+def to_epoch(value):
+    """Accepts epoch seconds or SQLite CURRENT_TIMESTAMP strings (UTC); None if unparseable."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(calendar.timegm(time.strptime(str(value)[:19], "%Y-%m-%d %H:%M:%S")))
+    except ValueError:
+        return None
+
+def is_fresh(url, *timestamps):
+    """True if the newest of the given fetch/revalidation times is within the URL's TTL."""
+    epochs = [e for e in (to_epoch(t) for t in timestamps) if e is not None]
+    return bool(epochs) and time.time() - max(epochs) < ttl_for(url)
+
+def content_hash(body):
+    """Stable hash of a page body (scraper passes distilled text), to spot unchanged pages served without validators."""
+    if isinstance(body, str):
+        body = body.encode("utf-8", errors="ignore")
+    return hashlib.sha256(body or b"").hexdigest()
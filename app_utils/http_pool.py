@@ -0,0 +1,130 @@
+# /opt/rabid-ui/app_utils/http_pool.py
+# Shared outbound HTTP layer: one pooled (HTTP/2 when h2 is installed) client per process,
+# per-host concurrency caps, politeness spacing for remote sites and retry with backoff.
+import importlib.util
+import ipaddress
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import httpx
+
+# --- CONFIGURATION ---
+MAX_CONNECTIONS = 64
+MAX_KEEPALIVE = 32
+KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 10.0
+
+PER_HOST_LIMIT = int(os.environ.get("RABID_HTTP_PER_HOST", "4"))  # Concurrent requests to one remote host
+LOCAL_HOST_LIMIT = 16                                             # Loopback/LAN services (SearXNG, gateways)
+POLITENESS_DELAY = float(os.environ.get("RABID_HTTP_POLITENESS", "0.25"))  # Min seconds between request starts per remote host
+
+RETRIES = 2
+BACKOFF_BASE = 0.3
+BACKOFF_MAX = 4.0
+RETRY_STATUSES = {429, 502, 503, 504}
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+@lru_cache(maxsize=1)
+def get_client():
+    """The process-wide pooled client (keep-alive, HTTP/2 if available)."""
+    return httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        follow_redirects=True,
+        timeout=DEFAULT_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        )
+    )
+
+# --- PER-HOST GATES ---
+
+def _is_local(host):
+    if host == "localhost":
+        return True
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return addr.is_loopback or addr.is_private
+
+class HostGate:
+    """Caps concurrent requests to one host and spaces out request starts (remote hosts only)."""
+
+    def __init__(self, host):
+        local = _is_local(host)
+        self.slots = threading.BoundedSemaphore(LOCAL_HOST_LIMIT if local else PER_HOST_LIMIT)
+        self.delay = 0.0 if local else POLITENESS_DELAY
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+
+    def __enter__(self):
+        self.slots.acquire()
+        if self.delay:
+            with self.lock:
+                start = max(time.monotonic(), self.next_start)
+                self.next_start = start + self.delay
+            wait = start - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self.slots.release()
+        return False
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+def gate_for(url):
+    host = (urlsplit(url).hostname or "").lower()
+    with _gates_lock:
+        if host not in _gates:
+            _gates[host] = HostGate(host)
+        return _gates[host]
+
+# --- REQUESTS ---
+
+def _backoff(attempt, resp=None):
+    """Exponential backoff with jitter; honours a numeric Retry-After within BACKOFF_MAX."""
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    return min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX) * random.uniform(0.5, 1.0)
+
+def request(method, url, retries=RETRIES, polite=True, **kwargs):
+    """
+    Sends one request through the shared client. Transport errors and RETRY_STATUSES are
+    retried with backoff; the last response (or error) is returned (or raised) unchanged.
+    polite=False skips the host gate (one-off API calls such as the OAuth exchange).
+    """
+    client = get_client()
+    for attempt in range(retries + 1):
+        try:
+            if polite:
+                with gate_for(url):
+                    resp = client.request(method, url, **kwargs)
+            else:
+                resp = client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if attempt >= retries:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+        if resp.status_code in RETRY_STATUSES and attempt < retries:
+            time.sleep(_backoff(attempt, resp))
+            continue
+        return resp
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -1,33 +1,151 @@
 # /opt/rabid-ui/app_utils/memory.py
+from app_utils import tokens, render_cache
 
-def get_short_term_memory(messages, limit=30):
+# --- PROMPT BUDGET ---
+PROMPT_BUDGET = 8192     # Default token budget for one assembled prompt
+RESPONSE_RESERVE = 2048  # Tokens kept free in the model's window for the answer
+MESSAGE_CHAR_CAP = 1200  # Per-message cap in the history block
+# Relative claim of each section on what is left after system + query; unused share flows to the others
+SECTION_WEIGHTS = {"files": 4, "web": 3, "history": 2, "recall": 1}
+
+def _history_block(messages, limit=30, budget_tokens=None, model=None):
     """
-    Retrieves the last 'limit' messages from the session state,
-    formatting them into a script for the LLM to read.
+    History script, filled newest-first when budgeted. Returns (block, kept, total, cost)
+    where cost is the token estimate the budget was checked against.
     """
     if not messages or len(messages) < 2:
-        return ""
-    
+        return "", 0, 0, 0
+
     # Slice: Get the last 'limit' messages, BUT exclude the very last one 
     # (which is the current query we just typed).
     recent_history = messages[-(limit + 1):-1]
-    
+
     if not recent_history:
-        return ""
+        return "", 0, 0, 0
 
-    block = "--- PREVIOUS CONVERSATION HISTORY ---\n"
-    for msg in recent_history:
+    header = "--- PREVIOUS CONVERSATION HISTORY ---\n"
+    footer = "--- END HISTORY ---\n"
+    cost = tokens.estimate(header + footer, model)
+
+    lines = []
+    for msg in reversed(recent_history):
         # Map 'user'/'assistant' to cleaner labels
         role = "User" if msg["role"] == "user" else "Assistant"
-        
-        # Clean newlines and truncate massive replies to save context window
-        content = msg["content"].replace("\n", " ").strip()[:1200]
-        block += f"{role}: {content}\n"
-    
-    block += "--- END HISTORY ---\n"
-    return block
 
-def build_final_prompt(system, history, web, files, query, reasoning_mode=False):
+        # Compact record (answer + winner, no drafts/markup), newlines cleaned, massive replies truncated
+        content = render_cache.compact(msg).replace("\n", " ").strip()[:MESSAGE_CHAR_CAP]
+        line = f"{role}: {content}\n"
+        line_cost = tokens.estimate(line, model)
+        if budget_tokens is not None and cost + line_cost > budget_tokens:
+            break
+        cost += line_cost
+        lines.append(line)
+
+    if not lines:
+        return "", 0, len(recent_history), 0
+    return header + "".join(reversed(lines)) + footer, len(lines), len(recent_history), cost
+
+def get_short_term_memory(messages, limit=30, budget_tokens=None, model=None):
+    """
+    Retrieves the last 'limit' messages from the session state,
+    formatting them into a script for the LLM to read.
+    With budget_tokens, the oldest messages are dropped until the script fits.
+    """
+    return _history_block(messages, limit, budget_tokens, model)[0]
+
+def split_budget(available, demands, weights):
+    """
+    Water-fills 'available' tokens across sections by weight. A section never gets more than
+    it asks for; its unused share is redistributed to the sections that still want more.
+    """
+    alloc = {k: 0 for k in demands}
+    active = {k for k, need in demands.items() if need > 0}
+    left = available
+    while active and left > 0:
+        total_weight = sum(weights.get(k, 1) for k in active)
+        shares = {k: left * weights.get(k, 1) / total_weight for k in active}
+        satisfied = [k for k in active if demands[k] - alloc[k] <= shares[k]]
+        if not satisfied:
+            for k in active:
+                alloc[k] += int(shares[k])
+            break
+        for k in satisfied:
+            left -= demands[k] - alloc[k]
+            alloc[k] = demands[k]
+            active.discard(k)
+    return alloc
+
+def assemble_prompt(system, messages, web, files, query, model=None, budget=PROMPT_BUDGET, reasoning_mode=False, summary=None, recalled=""):
+    """
+    Budget-aware build_final_prompt. System instructions and the query are kept whole
+    (the system prompt is cut only if it alone overflows); history, web and files share
+    the rest via SECTION_WEIGHTS. The budget is capped by the model's context window.
+    A rolling summary (db.get_summary) stands in for the messages it covers;
+    recalled past exchanges (recall.format_recall) take whatever budget the rest leaves.
+    Returns (prompt, trimmed) where trimmed lists {"section", "before", "after", "note"}.
+    """
+    budget = min(budget, tokens.context_window(model) - RESPONSE_RESERVE)
+    trimmed = []
+
+    fixed = tokens.estimate(build_final_prompt(system, "", "", "", query, reasoning_mode), model)
+    if fixed > budget:
+        before = tokens.estimate(system, model)
+        system = tokens.truncate(system, max(0, before - (fixed - budget)), model)
+        trimmed.append({"section": "system", "before": before, "after": tokens.estimate(system, model), "note": ""})
+        fixed = tokens.estimate(build_final_prompt(system, "", "", "", query, reasoning_mode), model)
+
+    summary_block = ""
+    if summary and summary.get("summary"):
+        summary_block = f"--- CONVERSATION SUMMARY (earlier turns) ---\n{summary['summary']}\n--- END SUMMARY ---\n"
+        # By message id, not position: session_state and the DB drift apart across reloads and tabs.
+        # Messages without an id (not saved yet) are always newer than the summary.
+        messages = [m for m in messages if m.get("id") is None or m["id"] > summary["covered_id"]]
+
+    _, _, total_msgs, history_cost = _history_block(messages, model=model)
+    demands = {
+        "history": tokens.estimate(summary_block, model) + history_cost,
+        "web": tokens.estimate(web, model),
+        "files": tokens.estimate(files, model),
+        "recall": tokens.estimate(recalled, model),
+    }
+    alloc = split_budget(max(0, budget - fixed), demands, SECTION_WEIGHTS)
+
+    summary_block = tokens.truncate(summary_block, alloc["history"], model)
+    raw_budget = alloc["history"] - tokens.estimate(summary_block, model)
+    history, kept_msgs, _, kept_cost = _history_block(messages, budget_tokens=raw_budget, model=model)
+    sections = {
+        "history": summary_block + history,
+        "web": tokens.truncate(web, alloc["web"], model),
+        "files": tokens.truncate(files, alloc["files"], model),
+        "recall": tokens.truncate(recalled, alloc["recall"], model),
+    }
+    costs = {
+        "history": tokens.estimate(summary_block, model) + kept_cost,
+        "web": tokens.estimate(sections["web"], model),
+        "files": tokens.estimate(sections["files"], model),
+        "recall": tokens.estimate(sections["recall"], model),
+    }
+    for name, after in costs.items():
+        if after < demands[name]:
+            note = f"kept {kept_msgs}/{total_msgs} msgs" if name == "history" else ""
+            trimmed.append({"section": name, "before": demands[name], "after": after, "note": note})
+
+    prompt = build_final_prompt(
+        system, sections["history"], sections["web"], sections["files"], query, reasoning_mode, recalled=sections["recall"]
+    )
+    return prompt, trimmed
+
+def format_trim_report(trimmed):
+    """One-line summary of assemble_prompt cuts, e.g. 'history 5.1k→1.2k tok (kept 6/30 msgs) · web 4.0k→2.9k tok'."""
+    def k(n):
+        return f"{n / 1000:.1f}k" if n >= 1000 else str(n)
+    parts = []
+    for t in trimmed:
+        note = f" ({t['note']})" if t["note"] else ""
+        parts.append(f"{t['section']} {k(t['before'])}→{k(t['after'])} tok{note}")
+    return " · ".join(parts)
+
+def build_final_prompt(system, history, web, files, query, reasoning_mode=False, recalled=""):
     """
     Assembles all context fragments into the final "Mega-Prompt".
     Injects Chain-of-Thought instructions if reasoning_mode is True.
@@ -51,6 +169,7 @@ def build_final_prompt(system, history, web, files, query, reasoning_mode=False)
     ETHICAL PROTOCOL: {safety_instruction}
     {cot_instruction}
     
+    {recalled}
     {history}
     
     WEB SEARCH RESULTS:
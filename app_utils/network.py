@@ -1,5 +1,5 @@
-import requests
 import random
+from app_utils import http_pool
 
 SEARXNG_URL = "http://127.0.0.1:4000/search"
 
@@ -7,28 +7,31 @@ def search(query):
     """Fetches broad search results (up to 15) for context sharding."""
     try:
         params = {"q": query, "format": "json", "engines": "bing,duckduckgo"}
-        res = requests.get(SEARXNG_URL, params=params).json()
+        res = http_pool.get(SEARXNG_URL, params=params, retries=1).json()
         return res.get('results', [])
     except Exception:
         return []
 
-def get_sharded_context(search_pool, seed, limit=4):
+def get_sharded_context(search_pool, seed, limit=4, overlap=0):
     """
     Deterministically shuffles and selects a subset of search results 
-    based on the agent's seed.
+    based on the agent's seed. The first 'overlap' (highest-ranked) results
+    are shared by every shard; the rest of the shard is seed-dependent.
     """
     if not search_pool:
         return "", ""
-        
+
+    overlap = max(0, min(overlap, limit))
+    shared = search_pool[:overlap]
+
     # Create a local copy to shuffle
-    shuffled = search_pool.copy()
+    shuffled = search_pool[overlap:]
     
-    # Deterministic shuffle
-    random.seed(seed)
-    random.shuffle(shuffled)
+    # Deterministic shuffle (private RNG so the global random state is left alone)
+    random.Random(seed).shuffle(shuffled)
     
     # Select subset
-    selection = shuffled[:limit]
+    selection = shared + shuffled[:limit - overlap]
     
     # Format for LLM
     context_str = "\n".join([f"[{r.get('title')}]({r.get('url')}): {r.get('content')}" for r in selection])
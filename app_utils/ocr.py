@@ -0,0 +1,223 @@
+# /opt/rabid-ui/app_utils/ocr.py
+# Parallel OCR off the Streamlit thread. Images are normalized for Tesseract (EXIF rotation,
+# grayscale, rescale towards ~300 DPI, Otsu binarization, deskew), tall images are cut into
+# overlapping strips, and every strip is OCR'd in a process pool under a per-image deadline.
+import concurrent.futures
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+# --- CONFIGURATION ---
+WORKERS = int(os.environ.get("RABID_OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMAGE_TIMEOUT = float(os.environ.get("RABID_OCR_TIMEOUT", "30"))  # Seconds per image (all of its tiles)
+TARGET_DPI = 300
+SCREEN_DPI = 96           # Assumed for images without DPI metadata (screenshots)
+MAX_SIDE = 3000           # Longest side after rescaling (caps upscaling and shrinks huge photos)
+TILE_HEIGHT = 1600        # Strips taller images are cut into
+TILE_OVERLAP = 60         # Pixels shared by neighbouring strips so lines on a seam survive in one of them
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+DESKEW_PROBE = 1000      # Side of the central crop the skew is estimated on
+TESSERACT_CONFIG = "--oem 1 --psm 3"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process pool (forkserver: safe to start from the threaded Streamlit server)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                ctx = multiprocessing.get_context("forkserver")
+            except ValueError:
+                ctx = multiprocessing.get_context("spawn")
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=WORKERS, mp_context=ctx)
+        return _pool
+
+def _discard_pool(pool):
+    """Drops a broken pool (a worker died, e.g. a native crash in pdfium) so the next call builds a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def submit(fn, *args):
+    """pool.submit that survives a dead worker: a broken pool is replaced, both on submit and when a task reports it."""
+    pool = get_pool()
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        pool = get_pool()
+        future = pool.submit(fn, *args)
+
+    def check(done):
+        if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool):
+            _discard_pool(pool)
+    future.add_done_callback(check)
+    return future
+
+# --- PREPROCESSING (runs in the worker) ---
+
+def _otsu_threshold(pixels):
+    import numpy as np
+
+    hist = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    total = pixels.size
+    cum_count = np.cumsum(hist)
+    cum_mean = np.cumsum(hist * np.arange(256))
+    mean_all = cum_mean[-1] / total
+    bg = cum_count / total
+    fg = 1.0 - bg
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean_all * bg - cum_mean / total) ** 2 / (bg * fg)
+    return int(np.nanargmax(between))
+
+def _skew_angle(binary):
+    """Angle (degrees) whose rotation makes text rows sharpest, by projection-profile variance."""
+    import numpy as np
+    from PIL import Image
+
+    # Estimate on a central crop at full resolution (shrinking would blur text rows together)
+    h, w = binary.shape
+    ch, cw = min(h, DESKEW_PROBE), min(w, DESKEW_PROBE)
+    top, left = (h - ch) // 2, (w - cw) // 2
+    probe = Image.fromarray(binary[top:top + ch, left:left + cw])
+    best_angle, best_score = 0.0, -1.0
+    steps = int(DESKEW_MAX_ANGLE / DESKEW_STEP)
+    for i in range(-steps, steps + 1):
+        angle = i * DESKEW_STEP
+        rotated = np.asarray(probe.rotate(angle, fillcolor=255, resample=Image.NEAREST))
+        score = float(np.var((rotated < 128).sum(axis=1)))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+def preprocess(data):
+    """Bytes in, Tesseract-ready grayscale binarized PIL image out."""
+    from PIL import Image, ImageOps
+
+    img = Image.open(io.BytesIO(data))
+    dpi = float(img.info.get("dpi", (SCREEN_DPI, SCREEN_DPI))[0] or SCREEN_DPI)
+    return normalize(ImageOps.exif_transpose(img), dpi)
+
+def normalize(img, dpi=SCREEN_DPI):
+    """PIL image at a known DPI in, Tesseract-ready image out (also used for rendered PDF pages)."""
+    import numpy as np
+    from PIL import Image
+
+    img = img.convert("L")
+
+    # Rescale towards TARGET_DPI (screenshots get upscaled, scans above it shrink), bounded by MAX_SIDE
+    scale = min(TARGET_DPI / dpi, MAX_SIDE / max(img.size))
+    if abs(scale - 1) > 0.05:
+        img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+
+    pixels = np.asarray(img)
+    binary = np.where(pixels > _otsu_threshold(pixels), 255, 0).astype(np.uint8)
+    # Light text on dark backgrounds (dark-mode screenshots): Tesseract wants dark on light
+    if (binary == 0).mean() > 0.5:
+        binary = 255 - binary
+
+    angle = _skew_angle(binary)
+    img = Image.fromarray(binary)
+    if angle:
+        img = img.rotate(angle, fillcolor=255, expand=True, resample=Image.BICUBIC)
+    return img
+
+def tiles(img):
+    """Horizontal strips of a tall image with TILE_OVERLAP pixels shared at each seam."""
+    if img.height <= TILE_HEIGHT:
+        return [img]
+    strips, top = [], 0
+    while top < img.height:
+        bottom = min(img.height, top + TILE_HEIGHT)
+        strips.append(img.crop((0, top, img.width, bottom)))
+        if bottom >= img.height:
+            break
+        top = bottom - TILE_OVERLAP
+    return strips
+
+def _to_png(img):
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+def prepare_tiles(data):
+    """Worker task: preprocess one image and return its tiles as PNG bytes."""
+    return [_to_png(t) for t in tiles(preprocess(data))]
+
+def ocr_tile(png, timeout):
+    """Worker task: OCR one tile (Tesseract is killed after timeout seconds)."""
+    from PIL import Image
+    import pytesseract
+
+    return pytesseract.image_to_string(Image.open(io.BytesIO(png)), config=TESSERACT_CONFIG, timeout=timeout)
+
+def ocr_image(img, dpi, timeout=IMAGE_TIMEOUT):
+    """Worker-side pipeline for an image already in the worker: normalize, tile, OCR tiles in sequence."""
+    import pytesseract
+
+    deadline = time.time() + timeout
+    texts = []
+    for tile in tiles(normalize(img, dpi)):
+        texts.append(pytesseract.image_to_string(tile, config=TESSERACT_CONFIG, timeout=max(1.0, deadline - time.time())))
+    return _join_strips(texts)
+
+def _join_strips(texts):
+    """Joins strip texts, dropping a line repeated across a seam by the overlap."""
+    lines = []
+    for text in texts:
+        new = text.splitlines()
+        while new and lines and new[0].strip() and new[0].strip() == lines[-1].strip():
+            new.pop(0)
+        lines.extend(new)
+    return "\n".join(lines).strip()
+
+# --- PIPELINE (runs in the app) ---
+
+def ocr_images(images, timeout=IMAGE_TIMEOUT):
+    """
+    OCRs a batch of images (bytes) in parallel: all images are preprocessed concurrently,
+    then every tile of every image is OCR'd concurrently. Returns [(text, ok)] in input order;
+    ok is False when the image failed or ran past its timeout (the caller shouldn't cache it).
+    """
+    if not images:
+        return []
+    started = time.time()
+    deadlines = [started + timeout for _ in images]
+    prepared = [submit(prepare_tiles, data) for data in images]
+
+    tile_futures = [None] * len(images)
+    results = [None] * len(images)
+    for i, future in enumerate(prepared):
+        try:
+            pngs = future.result(timeout=max(0.0, deadlines[i] - time.time()))
+        except concurrent.futures.TimeoutError:
+            results[i] = (f"[OCR timed out after {timeout:.0f}s during preprocessing]", False)
+            continue
+        except Exception as e:
+            results[i] = (f"[OCR failed: {e}]", False)
+            continue
+        remaining = max(1.0, deadlines[i] - time.time())
+        tile_futures[i] = [submit(ocr_tile, png, remaining) for png in pngs]
+
+    for i, futures in enumerate(tile_futures):
+        if futures is None:
+            continue
+        try:
+            texts = [f.result(timeout=max(0.0, deadlines[i] - time.time()) + 1.0) for f in futures]
+            results[i] = (_join_strips(texts), True)
+        except (concurrent.futures.TimeoutError, RuntimeError):
+            # RuntimeError: pytesseract's own timeout fired inside the worker
+            for f in futures:
+                f.cancel()
+            results[i] = (f"[OCR timed out after {timeout:.0f}s]", False)
+        except Exception as e:
+            results[i] = (f"[OCR failed: {e}]", False)
+    return results
@@ -0,0 +1,104 @@
+# /opt/rabid-ui/app_utils/passages.py
+import math
+import re
+from collections import Counter
+from app_utils import tokens
+
+# --- CONFIGURATION ---
+PASSAGE_CHARS = 700   # Target passage size before ranking
+SEPARATOR = "\n[…]\n"
+
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-\+\.#]*")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "of", "for", "to", "in", "on",
+    "and", "or", "with", "by", "at", "as", "it", "this", "that", "from", "how", "what", "why",
+    "when", "which", "who", "do", "does", "can", "i", "you", "we", "they"
+}
+
+def tokenize(text):
+    """Lowercased content words (stopwords dropped) for lexical scoring."""
+    return [w.strip(".") for w in WORD_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+
+def split_passages(text, target_chars=PASSAGE_CHARS):
+    """
+    Splits a page into roughly target_chars passages along line boundaries.
+    Very long lines (walls of text) are split on sentence boundaries.
+    """
+    units = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) <= target_chars:
+            units.append(line)
+        else:
+            units.extend(s for s in SENTENCE_SPLIT.split(line) if s.strip())
+
+    chunks, current = [], ""
+    for unit in units:
+        if current and len(current) + len(unit) + 1 > target_chars:
+            chunks.append(current)
+            current = unit
+        else:
+            current = f"{current}\n{unit}" if current else unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+class BM25:
+    """Okapi BM25 over a small in-memory corpus (one page or one upload set)."""
+
+    def __init__(self, docs, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_terms = [Counter(tokenize(d)) for d in docs]
+        self.doc_lens = [sum(c.values()) for c in self.doc_terms]
+        self.avg_len = (sum(self.doc_lens) / len(self.doc_lens)) if self.doc_lens else 0.0
+        df = Counter()
+        for terms in self.doc_terms:
+            df.update(terms.keys())
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def scores(self, query):
+        q_terms = set(tokenize(query))
+        results = []
+        for terms, length in zip(self.doc_terms, self.doc_lens):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_len or 1))
+            for t in q_terms:
+                tf = terms.get(t)
+                if tf:
+                    score += self.idf[t] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+def select_passages(text, query, budget_tokens):
+    """
+    Ranks a page's passages against the query and packs the best ones into budget_tokens.
+    Picked passages are re-emitted in page order so the excerpt still reads naturally.
+    """
+    if not text or tokens.estimate(text) <= budget_tokens:
+        return text
+
+    chunks = split_passages(text)
+    if not chunks:
+        return text
+
+    scores = BM25(chunks).scores(query or "")
+    # Ties (and queries with no lexical overlap) fall back to page order
+    ranked = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+
+    picked, used = [], 0
+    for i in ranked:
+        cost = tokens.estimate(chunks[i])
+        if used + cost > budget_tokens:
+            if not picked:
+                picked.append(i)  # Always return something, trimmed below
+            continue
+        picked.append(i)
+        used += cost
+
+    excerpt = SEPARATOR.join(chunks[i] for i in sorted(picked))
+    return tokens.truncate(excerpt, budget_tokens)
@@ -0,0 +1,151 @@
+# /opt/rabid-ui/app_utils/pdf_extract.py
+# PDF text extraction off the Streamlit process. Workers in the OCR process pool open the saved
+# file themselves (only text crosses back), pull the text layer of page batches in parallel,
+# and pages with no usable text layer (scans) are rendered and OCR'd, all under one deadline.
+import concurrent.futures
+import importlib.util
+import os
+import time
+from app_utils import ocr
+
+# --- CONFIGURATION ---
+PDFIUM_AVAILABLE = importlib.util.find_spec("pypdfium2") is not None  # Text + rendering (OCR fallback)
+PYPDF_AVAILABLE = importlib.util.find_spec("pypdf") is not None       # Text layer only
+MAX_PAGES = int(os.environ.get("RABID_PDF_MAX_PAGES", "300"))
+MAX_OCR_PAGES = int(os.environ.get("RABID_PDF_MAX_OCR_PAGES", "40"))
+PDF_TIMEOUT = float(os.environ.get("RABID_PDF_TIMEOUT", "90"))   # Seconds per PDF, text layer and OCR together
+PAGES_PER_TASK = 8
+MIN_PAGE_CHARS = 40        # Below this a page is treated as scanned and sent to OCR
+RENDER_DPI = 300
+
+# --- WORKER TASKS ---
+
+def page_count(path):
+    if PDFIUM_AVAILABLE:
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+def extract_pages(path, start, stop):
+    """Text layer of pages [start, stop): [(index, text)]."""
+    out = []
+    if PDFIUM_AVAILABLE:
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(path)
+        try:
+            for i in range(start, stop):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                out.append((i, textpage.get_text_range()))
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+        return out
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    for i in range(start, stop):
+        try:
+            out.append((i, reader.pages[i].extract_text() or ""))
+        except Exception:
+            out.append((i, ""))
+    return out
+
+def ocr_page(path, index, timeout):
+    """Renders one page at RENDER_DPI and OCRs it (the bitmap never leaves the worker)."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(path)
+    try:
+        page = pdf[index]
+        img = page.render(scale=RENDER_DPI / 72).to_pil()
+        page.close()
+    finally:
+        pdf.close()
+    return ocr.ocr_image(img, RENDER_DPI, timeout)
+
+# --- PIPELINE (runs in the app) ---
+
+def extract_pdf(path, progress=None, timeout=PDF_TIMEOUT):
+    """
+    Returns (docs, ok): one {"member": "page N", "kind", "text"} per page with text, plus a
+    PDF_NOTE doc when pages were skipped. ok is False when anything was cut short (don't cache).
+    """
+    if not (PDFIUM_AVAILABLE or PYPDF_AVAILABLE):
+        return [{"member": None, "kind": "PDF_NOTE", "text": "[PDF not extracted: install pypdfium2 or pypdf]"}], False
+
+    report = progress or (lambda msg: None)
+    deadline = time.time() + timeout
+    try:
+        total = ocr.submit(page_count, path).result(timeout=max(1.0, deadline - time.time()))
+    except Exception as e:
+        return [{"member": None, "kind": "PDF_NOTE", "text": f"[PDF could not be opened: {e}]"}], False
+
+    pages = min(total, MAX_PAGES)
+    notes, ok = [], True
+    if total > pages:
+        notes.append(f"only the first {pages} of {total} pages were read")
+
+    # 1. Text layer, PAGES_PER_TASK pages per worker task
+    texts = {}
+    futures = [ocr.submit(extract_pages, path, s, min(pages, s + PAGES_PER_TASK)) for s in range(0, pages, PAGES_PER_TASK)]
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=max(0.0, deadline - time.time())):
+            try:
+                texts.update(future.result())
+            except Exception:
+                ok = False
+                notes.append("a batch of pages could not be read")
+            report(f"📄 Reading PDF: {len(texts)}/{pages} pages")
+    except concurrent.futures.TimeoutError:
+        for f in futures:
+            f.cancel()
+        ok = False
+        notes.append(f"text extraction timed out after {len(texts)} pages")
+
+    # 2. OCR fallback for pages without a usable text layer
+    scanned = [i for i in range(pages) if i in texts and len(texts[i].strip()) < MIN_PAGE_CHARS]
+    kinds = {}
+    if scanned and not PDFIUM_AVAILABLE:
+        notes.append(f"{len(scanned)} scanned pages skipped (OCR needs pypdfium2)")
+    elif scanned:
+        if len(scanned) > MAX_OCR_PAGES:
+            notes.append(f"only the first {MAX_OCR_PAGES} of {len(scanned)} scanned pages were OCR'd")
+            scanned = scanned[:MAX_OCR_PAGES]
+        per_page = min(ocr.IMAGE_TIMEOUT, max(1.0, deadline - time.time()))
+        pending = {ocr.submit(ocr_page, path, i, per_page): i for i in scanned}
+        done, failed = 0, 0
+        try:
+            for future in concurrent.futures.as_completed(pending, timeout=max(0.0, deadline - time.time()) + 1.0):
+                done += 1
+                try:
+                    texts[pending[future]] = future.result()
+                    kinds[pending[future]] = "PDF_OCR"
+                except Exception:
+                    failed += 1
+                    ok = False
+                report(f"🔍 OCR of scanned PDF pages: {done}/{len(pending)}")
+        except concurrent.futures.TimeoutError:
+            for f in pending:
+                f.cancel()
+            ok = False
+            notes.append(f"OCR timed out after {done} of {len(pending)} scanned pages")
+        if failed:
+            notes.append(f"OCR failed on {failed} scanned pages")
+
+    docs = [
+        {"member": f"page {i + 1}", "kind": kinds.get(i, "PDF_PAGE"), "text": texts[i]}
+        for i in sorted(texts) if texts[i].strip()
+    ]
+    if notes:
+        docs.append({"member": None, "kind": "PDF_NOTE", "text": f"[PDF partially extracted: {'; '.join(notes)}]"})
+    return docs, ok
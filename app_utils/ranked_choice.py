@@ -2,6 +2,7 @@ import re
 import json
 import streamlit as st
 import random
+from app_utils import context_sizing
 
 def conduct_vote(all_responses, user_query, client, seed=None):
     """Orchestrates the Ranked Choice Vote and captures all round data."""
@@ -45,7 +46,10 @@ def collect_ballot(agent_config, all_responses, user_query, client, options=None
     
     candidate_text = ""
     for r in all_responses:
-        candidate_text += f"---\nNAME: {r['name']}\nRESPONSE: {r['content'][:800]}\n"
+        candidate_text += f"---\nNAME: {r['name']}\n"
+        if r.get('shard'):
+            candidate_text += f"EVIDENCE READ: {r['shard']}\n"
+        candidate_text += f"RESPONSE: {r['content'][:800]}\n"
         
     # Safe Example Names
     ex1 = candidate_names[0] if len(candidate_names) > 0 else "Model A"
@@ -75,7 +79,7 @@ def collect_ballot(agent_config, all_responses, user_query, client, options=None
         response = client.chat(
             model=agent_config['model'], 
             messages=[{'role': 'user', 'content': prompt}],
-            options=final_opts
+            options=context_sizing.options_for(agent_config['model'], prompt, output_tokens=256, options=final_opts)
         )
         content = response['message']['content']
         
@@ -0,0 +1,205 @@
+# /opt/rabid-ui/app_utils/recall.py
+# Per-session semantic memory. Every finished exchange (user query + assistant answer) is
+# embedded in the background as db.save_message writes it; at prompt time the most similar
+# past exchanges are recalled with a brute-force cosine search over an in-memory matrix.
+import concurrent.futures
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from app_utils import db, render_cache
+
+# --- CONFIGURATION ---
+EMBED_MODEL = os.environ.get("RABID_EMBED_MODEL", "nomic-embed-text")
+HASH_MODEL = "hash-512"   # Local fallback when Ollama can't embed (no model pulled, server busy)
+HASH_DIM = 512
+EXCHANGE_CHAR_CAP = 4000  # Text embedded and stored per exchange
+TOP_K = 3
+MIN_SCORE = 0.3           # Cosine floor; below this a "match" is noise
+RECALL_CHAR_CAP = 1200    # Per exchange in the prompt
+
+WORD_PATTERN = re.compile(r"\w+")
+
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="rabid-recall")
+_matrices = {}            # session_id -> {"ids", "texts", "models", "vectors" (float32, L2-normalized)}
+_lock = threading.Lock()
+
+def init_index():
+    """Creates the vector table (lives in rabidui.db next to the messages it indexes)."""
+    db.init_db()
+    with sqlite3.connect(db.DB_FILE) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory_vectors (
+                message_id INTEGER PRIMARY KEY,
+                session_id TEXT,
+                model TEXT,
+                text TEXT,
+                vector BLOB
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_vectors_session ON memory_vectors(session_id, message_id)")
+        conn.commit()
+
+# --- EMBEDDING ---
+
+def hash_embed(text):
+    """Feature-hashed unigrams + bigrams: crude, but lexical recall works without any model."""
+    import numpy as np
+
+    vec = np.zeros(HASH_DIM, dtype=np.float32)
+    words = WORD_PATTERN.findall((text or "").lower())
+    for gram in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        vec[h % HASH_DIM] += 1.0 if (h >> 63) else -1.0
+    return vec
+
+def embed(text, model=None):
+    """Returns (model_name, normalized float32 vector); Ollama first, hashing fallback."""
+    import numpy as np
+
+    vec, used = None, HASH_MODEL
+    if model != HASH_MODEL:
+        try:
+            from app_utils import bridge
+            client = bridge.get_client()
+            try:
+                vec = client.embed(model=model or EMBED_MODEL, input=text)["embeddings"][0]
+            except AttributeError:
+                vec = client.embeddings(model=model or EMBED_MODEL, prompt=text)["embedding"]
+            used = model or EMBED_MODEL
+        except Exception:
+            vec = None
+    if vec is None:
+        vec, used = hash_embed(text), HASH_MODEL
+
+    vec = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return used, (vec / norm if norm else vec)
+
+# --- INDEXING ---
+
+def exchange_text(query, answer):
+    return f"User: {query}\nAssistant: {answer}"[:EXCHANGE_CHAR_CAP]
+
+def index_message(session_id, message_id, role, content):
+    """Embeds the exchange an assistant message completes and appends it to the session index."""
+    import numpy as np
+
+    if role != "assistant":
+        return
+    init_index()
+    with sqlite3.connect(db.DB_FILE) as conn:
+        row = conn.execute(
+            "SELECT content FROM messages WHERE session_id = ? AND id < ? AND role = 'user' ORDER BY id DESC LIMIT 1",
+            (session_id, message_id)
+        ).fetchone()
+    text = exchange_text(row[0] if row else "", render_cache.compact_text(content))
+    model, vec = embed(text)
+
+    with sqlite3.connect(db.DB_FILE) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO memory_vectors (message_id, session_id, model, text, vector) VALUES (?, ?, ?, ?, ?)",
+            (message_id, session_id, model, text, vec.astype(np.float16).tobytes())
+        )
+        conn.commit()
+
+    with _lock:
+        cached = _matrices.get(session_id)
+        if cached is not None:
+            cached["ids"].append(message_id)
+            cached["texts"].append(text)
+            cached["models"].append(model)
+            cached["vectors"].append(vec)
+            cached["stacked"] = None
+
+def _safe_index(*args):
+    try:
+        index_message(*args)
+    except Exception:
+        pass  # A missed exchange only costs recall, never the turn
+
+def schedule_index(session_id, message_id, role, content):
+    """Called from db.save_message: indexes off the request path."""
+    if role == "assistant":
+        _executor.submit(_safe_index, session_id, message_id, role, content)
+
+def forget(session_id):
+    """Drops a session's vectors (history cleared)."""
+    init_index()
+    with sqlite3.connect(db.DB_FILE) as conn:
+        conn.execute("DELETE FROM memory_vectors WHERE session_id = ?", (session_id,))
+        conn.commit()
+    with _lock:
+        _matrices.pop(session_id, None)
+
+# --- SEARCH ---
+
+def _load(session_id):
+    import numpy as np
+
+    with _lock:
+        cached = _matrices.get(session_id)
+        if cached is not None:
+            return cached
+    init_index()
+    with sqlite3.connect(db.DB_FILE) as conn:
+        rows = conn.execute(
+            "SELECT message_id, model, text, vector FROM memory_vectors WHERE session_id = ? ORDER BY message_id",
+            (session_id,)
+        ).fetchall()
+    cached = {
+        "ids": [r[0] for r in rows],
+        "models": [r[1] for r in rows],
+        "texts": [r[2] for r in rows],
+        "vectors": [np.frombuffer(r[3], dtype=np.float16).astype(np.float32) for r in rows],
+        "stacked": None,
+    }
+    with _lock:
+        return _matrices.setdefault(session_id, cached)
+
+def search(session_id, query, k=TOP_K, skip_recent=0):
+    """
+    Top-k past exchanges most similar to the query: [(score, text)], best first.
+    The newest skip_recent exchanges are left out (they are already in the raw history).
+    """
+    import numpy as np
+
+    index = _load(session_id)
+    with _lock:
+        if index["stacked"] is None:
+            index["stacked"] = {}
+            for model in set(index["models"]):
+                rows = [i for i, m in enumerate(index["models"]) if m == model]
+                index["stacked"][model] = (np.array(rows), np.vstack([index["vectors"][i] for i in rows]))
+        stacked = index["stacked"]
+        texts = list(index["texts"])
+
+    limit = len(texts) - skip_recent
+    if limit <= 0:
+        return []
+
+    hits = []
+    # Vectors from different models live in different spaces: score each group with its own query embedding
+    for model, (rows, matrix) in stacked.items():
+        keep = rows < limit
+        if not keep.any():
+            continue
+        used, q = embed(query, model)
+        if used != model:
+            continue
+        scores = matrix[keep] @ q
+        for idx, score in zip(rows[keep], scores):
+            if score >= MIN_SCORE:
+                hits.append((float(score), texts[idx]))
+    hits.sort(key=lambda h: -h[0])
+    return hits[:k]
+
+def format_recall(hits):
+    """RELEVANT PAST EXCHANGES block for the prompt."""
+    if not hits:
+        return ""
+    block = "--- RELEVANT PAST EXCHANGES (recalled from earlier in this workspace) ---\n"
+    for score, text in hits:
+        block += f"[similarity {score:.2f}]\n{text[:RECALL_CHAR_CAP]}\n\n"
+    return block + "--- END RECALL ---\n"
@@ -0,0 +1,89 @@
+# /opt/rabid-ui/app_utils/render_cache.py
+import re
+
+# --- CONFIGURATION ---
+RECENT_TURNS = 6        # Messages at the tail of the chat that render fully on every rerun
+PREVIEW_CHARS = 120
+
+THINK_PATTERN = re.compile(r"<think>(.*?)</think>", re.DOTALL)
+DETAILS_PATTERN = re.compile(r"<details>\s*<summary>(.*?)</summary>(.*?)</details>", re.DOTALL)
+# Only the markup app.py itself wraps reports in; anything else (<stdio.h>, vector<int>, a<b) is content
+TAG_PATTERN = re.compile(r"</?(?:br|b|summary|details)\s*/?>", re.IGNORECASE)
+# consensus sources already read "Represented by: X", which the heading repeats
+WINNER_PATTERN = re.compile(r"^#+\s*🏆\s*REPRESENTED BY:\s*(?:Represented by:\s*)?(.+)$", re.MULTILINE)
+REPORTS_HEADING = "🕵️ Intelligence Reports"
+WHITESPACE_PATTERN = re.compile(r"[ \t]*\n\s*\n\s*")
+
+def parse(content):
+    """
+    Splits a stored message into its renderable parts:
+    reasoning (<think> block), the final body, and collapsible report sections (<details>).
+    """
+    reasoning = None
+    body = content or ""
+
+    if "<think>" in body:
+        match = THINK_PATTERN.search(body)
+        if match:
+            reasoning = match.group(1).strip()
+            body = THINK_PATTERN.sub("", body).strip()
+
+    sections = []
+    if "<details>" in body:
+        for title, section_body in DETAILS_PATTERN.findall(body):
+            sections.append({"title": title.strip(), "body": section_body.strip()})
+        body = DETAILS_PATTERN.sub("", body).strip()
+
+    # Plain-text preview for collapsed rows (markup stripped, one line)
+    preview = TAG_PATTERN.sub("", body).replace("\n", " ").strip()
+    if len(preview) > PREVIEW_CHARS:
+        preview = preview[:PREVIEW_CHARS].rstrip() + "…"
+
+    return {"reasoning": reasoning, "body": body, "sections": sections, "preview": preview}
+
+def prepare(msg):
+    """Attaches the parsed structure to a message dict once and returns it."""
+    parsed = msg.get("parsed")
+    if parsed is None:
+        parsed = parse(msg.get("content", ""))
+        msg["parsed"] = parsed
+    return parsed
+
+def prepare_all(messages):
+    """Parses a freshly loaded history in one pass so reruns never touch the regexes."""
+    for msg in messages:
+        prepare(msg)
+    return messages
+
+def compact_text(content):
+    """
+    Memory record for a stored message: the answer only. Reasoning, <details> reports
+    (other agents' drafts, lounge logs) and markup are dropped; a consensus turn keeps
+    its winner as a '[Winner: …]' prefix.
+    """
+    return _compact(parse(content))
+
+def _compact(parsed):
+    body = parsed["body"]
+    winner = None
+    match = WINNER_PATTERN.search(body)
+    if match:
+        winner = match.group(1).strip()
+        body = body[:match.start()] + body[match.end():]
+    body = TAG_PATTERN.sub(" ", body).replace(REPORTS_HEADING, "")
+    body = WHITESPACE_PATTERN.sub("\n", body).strip()
+    return f"[Winner: {winner}] {body}" if winner else body
+
+def compact(msg):
+    """compact_text for a session message, cached on the message next to its parse."""
+    record = msg.get("compact")
+    if record is None:
+        record = _compact(prepare(msg))
+        msg["compact"] = record
+    return record
+
+def make_message(role, content, message_id=None):
+    """Builds a session message (with its db id, once saved) with its render cache already filled."""
+    msg = {"id": message_id, "role": role, "content": content}
+    prepare(msg)
+    return msg
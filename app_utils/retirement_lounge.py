@@ -2,6 +2,7 @@ import re
 import json
 import random
 import os
+from app_utils import context_sizing
 
 # --- FILE PATHS (Resolved for Ubuntu Host) ---
 # Ensures we look in the same directory as this script for logs
@@ -69,7 +70,7 @@ def collect_retirement_list(agent_config, all_responses, user_query, client):
         response = client.chat(
             model=agent_config['model'], 
             messages=[{'role': 'user', 'content': prompt}], 
-            options={"temperature": 0.5}
+            options=context_sizing.options_for(agent_config['model'], prompt, output_tokens=256, options={"temperature": 0.5})
         )
         content = response['message']['content']
         
@@ -1,6 +1,10 @@
-import docker
+import functools
 
-client = docker.from_env()
+@functools.lru_cache(maxsize=1)
+def get_docker_client():
+    """Connects to the Docker daemon on first use instead of at import."""
+    import docker
+    return docker.from_env()
 
 def run_code_in_docker(code_snippet):
     """
@@ -12,7 +16,7 @@ def run_code_in_docker(code_snippet):
         # Safety: Ensure image exists or pull
         image_tag = "rabid-sandbox:heavy"
         
-        container = client.containers.run(
+        container = get_docker_client().containers.run(
             image_tag,
             command=["python", "-c", code_snippet],
             detach=True,
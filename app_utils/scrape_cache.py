@@ -0,0 +1,142 @@
+# /opt/rabid-ui/app_utils/scrape_cache.py
+import sqlite3
+import os
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# --- CONFIGURATION ---
+SCRAPER_ROOT = "/opt/rabid-scrape"
+DB_PATH = os.path.join(SCRAPER_ROOT, "scrapes.db")
+
+# Supporting index for "latest scrape of URL x"; applied by scrape_daemon.py and refresh.sh
+INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_scrapes_url_ts ON scrapes(url, timestamp DESC)"
+
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src", "igshid", "_hsenc", "_hsmi"}
+
+# --- URL NORMALIZATION ---
+
+def _clean_query(query):
+    pairs = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS]
+    return urlencode(sorted(pairs))
+
+def normalize_url(url):
+    """
+    Canonical cache key: scheme-agnostic, lowercase host without www/default port,
+    no fragment, no tracking params, sorted query, no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or ""
+    query = _clean_query(parts.query)
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
+def url_variants(url):
+    """Spellings of the same page that may have been stored raw in scrapes.db."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    bare = host[4:] if host.startswith("www.") else host
+    if parts.port and parts.port not in (80, 443):
+        bare = f"{bare}:{parts.port}"
+    path = parts.path.rstrip("/")
+    queries = {parts.query, _clean_query(parts.query)}
+
+    variants = {url}
+    for scheme in ("https", "http"):
+        for netloc in (bare, f"www.{bare}"):
+            for p in (path, path + "/"):
+                for q in queries:
+                    variants.add(urlunsplit((scheme, netloc, p or "/", q, "")))
+    return variants
+
+# --- POOLED READER ---
+# One read-only connection per process, shared across the deep-read threads behind a lock.
+
+_conn = None
+_conn_lock = threading.Lock()
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+    return _conn
+
+def _reset_conn():
+    global _conn
+    try:
+        if _conn is not None:
+            _conn.close()
+    except sqlite3.Error:
+        pass
+    _conn = None
+
+def _query(sql, params=()):
+    """Runs a read query on the pooled connection, reconnecting once if it went bad."""
+    if not os.path.exists(DB_PATH):
+        return []
+    with _conn_lock:
+        for attempt in range(2):
+            try:
+                return _get_conn().execute(sql, params).fetchall()
+            except sqlite3.Error:
+                _reset_conn()
+                if attempt:
+                    raise
+    return []
+
+def lookup_many(urls, with_timestamp=False):
+    """
+    Resolves a batch of URLs against scrapes.db in one query.
+    Returns {original_url: latest_content} for every URL with a cached scrape,
+    or {original_url: (latest_content, timestamp)} with with_timestamp=True.
+    """
+    urls = [u for u in urls if u]
+    if not urls:
+        return {}
+
+    wanted = {}
+    candidates = set()
+    for u in urls:
+        wanted.setdefault(normalize_url(u), []).append(u)
+        candidates |= url_variants(u)
+
+    placeholders = ",".join("?" for _ in candidates)
+    try:
+        rows = _query(
+            f"SELECT url, content, timestamp FROM scrapes WHERE url IN ({placeholders}) ORDER BY timestamp DESC",
+            tuple(candidates)
+        )
+    except sqlite3.Error:
+        return {}
+
+    found = {}
+    for row_url, content, timestamp in rows:
+        key = normalize_url(row_url)
+        if key in wanted and key not in found and content:
+            found[key] = (content, timestamp) if with_timestamp else content
+
+    return {u: found[key] for key, originals in wanted.items() if key in found for u in originals}
+
+def lookup(url, with_timestamp=False):
+    """Single-URL convenience wrapper around lookup_many."""
+    return lookup_many([url], with_timestamp=with_timestamp).get(url)
+
+def recent(limit=50):
+    """Latest scrapes for the admin inspector: rows of (id, url, method, content, timestamp)."""
+    try:
+        return _query(
+            "SELECT id, url, method, content, timestamp FROM scrapes ORDER BY timestamp DESC LIMIT ?",
+            (limit,)
+        )
+    except sqlite3.Error:
+        return []
+
+def ensure_index():
+    """Creates the lookup index (needs write access, so the daemon/deploy script calls this)."""
+    with sqlite3.connect(DB_PATH, timeout=10) as conn:
+        conn.execute(INDEX_SQL)
+        conn.commit()
@@ -0,0 +1,146 @@
+# /opt/rabid-ui/app_utils/scrape_queue.py
+# Shared by the app (submit/wait) and scrape_daemon.py (claim/finish). Stdlib only:
+# the daemon runs inside the rabid-scrape venv, which has none of the app's dependencies.
+import sqlite3
+import os
+import time
+import socket
+
+# --- CONFIGURATION ---
+QUEUE_DB = os.environ.get("RABID_SCRAPE_QUEUE_DB", "/opt/rabid-scrape/jobs.db")
+HEARTBEAT_MAX_AGE = 15.0   # Seconds before a silent daemon is considered dead
+POLL_INTERVAL = 0.05
+POLL_INTERVAL_MAX = 0.25
+STALE_JOB_SECONDS = 300    # Running jobs older than this are handed back to the queue
+
+def _connect():
+    conn = sqlite3.connect(QUEUE_DB, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def init_queue():
+    """Creates the job and worker tables."""
+    os.makedirs(os.path.dirname(QUEUE_DB), exist_ok=True)
+    with _connect() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT,
+                status TEXT DEFAULT 'queued',
+                error TEXT,
+                worker TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                name TEXT PRIMARY KEY,
+                pid INTEGER,
+                heartbeat REAL
+            )
+        """)
+        conn.commit()
+
+# --- CLIENT SIDE (app) ---
+
+def daemon_alive():
+    """True if at least one scrape worker has checked in recently."""
+    if not os.path.exists(QUEUE_DB):
+        return False
+    try:
+        with sqlite3.connect(QUEUE_DB, timeout=2) as conn:
+            row = conn.execute("SELECT MAX(heartbeat) FROM workers").fetchone()
+        return bool(row and row[0] and time.time() - row[0] < HEARTBEAT_MAX_AGE)
+    except sqlite3.Error:
+        return False
+
+def submit(url):
+    """Queues a URL and returns its job id (joins an identical job that is already pending)."""
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE url = ? AND status IN ('queued', 'running') ORDER BY id DESC LIMIT 1",
+            (url,)
+        ).fetchone()
+        if row:
+            return row[0]
+        cursor = conn.execute(
+            "INSERT INTO jobs (url, status, created_at) VALUES (?, 'queued', ?)",
+            (url, time.time())
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+def get_job(job_id):
+    with sqlite3.connect(QUEUE_DB, timeout=5) as conn:
+        row = conn.execute("SELECT status, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return {"status": row[0], "error": row[1]} if row else None
+
+def wait(job_id, deadline):
+    """Polls until the job finishes or the absolute deadline (time.time()) passes; None on timeout."""
+    interval = POLL_INTERVAL
+    while time.time() < deadline:
+        job = get_job(job_id)
+        if job and job["status"] in ("done", "failed"):
+            return job
+        time.sleep(min(interval, max(0.0, deadline - time.time())))
+        interval = min(interval * 2, POLL_INTERVAL_MAX)
+    return None
+
+# --- WORKER SIDE (daemon) ---
+
+def worker_name(index):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+def heartbeat(name):
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO workers (name, pid, heartbeat) VALUES (?, ?, ?)",
+            (name, os.getpid(), time.time())
+        )
+        conn.commit()
+
+def retire(name):
+    with _connect() as conn:
+        conn.execute("DELETE FROM workers WHERE name = ?", (name,))
+        conn.commit()
+
+def claim(name):
+    """Atomically takes the oldest queued job. Returns (job_id, url) or None."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        # Recover jobs whose worker died mid-scrape
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND started_at < ?",
+            (time.time() - STALE_JOB_SECONDS,)
+        )
+        row = conn.execute("SELECT id, url FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+        if row:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ? WHERE id = ?",
+                (name, time.time(), row[0])
+            )
+        conn.commit()
+        return row
+    finally:
+        conn.close()
+
+def finish(job_id, ok, error=None):
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            ("done" if ok else "failed", error, time.time(), job_id)
+        )
+        conn.commit()
+
+def prune(max_age=86400):
+    """Drops finished jobs older than max_age seconds."""
+    with _connect() as conn:
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - max_age,)
+        )
+        conn.commit()
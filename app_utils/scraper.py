@@ -1,34 +1,130 @@
-import httpx
-from bs4 import BeautifulSoup
+import re
+from app_utils import freshness, http_pool
 
-def fetch_and_distill(url, timeout=5):
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+# --- QUALITY HEURISTIC THRESHOLDS ---
+MIN_TEXT_CHARS = 800         # Less readable text than this is probably a shell page
+MAX_BOILERPLATE_RATIO = 0.7  # Share of lines that look like menu items / link lists
+MIN_TEXT_TO_HTML_RATIO = 0.02
+JS_WALL_PATTERN = re.compile(
+    r"enable javascript|javascript is (?:disabled|required)|turn on javascript|"
+    r"checking your browser|just a moment\.\.\.|cf-browser-verification|"
+    r"please verify you are a human|access denied",
+    re.IGNORECASE
+)
+SPA_ROOT_PATTERN = re.compile(r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.IGNORECASE)
+
+def fetch_page(url, timeout=5, validators=None):
     """
-    Grabs HTML, strips the junk (scripts, styles, nav), and returns clean text.
+    Plain HTTP GET; returns the response (raises on HTTP errors).
+    With validators ({etag, last_modified}) the request is conditional and a 304 is returned, not raised.
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    headers = dict(HEADERS)
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    resp = http_pool.get(url, headers=headers, timeout=timeout, retries=1)
+    if resp.status_code == 304 and validators:
+        return resp
+    resp.raise_for_status()
+    return resp
+
+def response_validators(resp):
+    """Freshness metadata of a response: {etag, last_modified}; fetch_tiered adds content_hash."""
+    return {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
     }
 
+def distill(html):
+    """Strips scripts, styles and chrome from HTML and returns paragraph-preserving text."""
+    from bs4 import BeautifulSoup
+
+    # 1. The Parse
+    soup = BeautifulSoup(html, "html.parser")
+
+    # 2. The Purge (Remove noise)
+    for element in soup(["script", "style", "nav", "footer", "header", "form", "svg"]):
+        element.decompose()  # Nuke it from orbit
+
+    # 3. The Distill
+    # get_text with separator='\n' preserves paragraph structure, which LLMs need.
+    return soup.get_text(separator="\n", strip=True)
+
+def assess_quality(html, text):
+    """
+    Decides whether the cheap HTTP tier produced a usable page.
+    Returns (ok, reason) — reason explains an escalation to the browser tier.
+    """
+    if JS_WALL_PATTERN.search(text[:2000]) and len(text) < MIN_TEXT_CHARS * 3:
+        return False, "js-wall"
+    if SPA_ROOT_PATTERN.search(html) and len(text) < MIN_TEXT_CHARS:
+        return False, "spa-shell"
+    if len(text) < MIN_TEXT_CHARS:
+        return False, "thin"
+
+    lines = [l for l in text.split("\n") if l.strip()]
+    short_lines = sum(1 for l in lines if len(l) < 30)
+    if lines and short_lines / len(lines) > MAX_BOILERPLATE_RATIO:
+        return False, "boilerplate"
+
+    if html and len(text) / len(html) < MIN_TEXT_TO_HTML_RATIO:
+        return False, "script-heavy"
+    return True, "ok"
+
+def fetch_and_distill(url, timeout=5):
+    """
+    Grabs HTML, strips the junk (scripts, styles, nav), and returns clean text.
+    """
     try:
         # 1. The Grab
-        with httpx.Client(follow_redirects=True, timeout=timeout) as client:
-            resp = client.get(url, headers=headers)
-            resp.raise_for_status()
-
-        # 2. The Parse
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # 3. The Purge (Remove noise)
-        for element in soup(["script", "style", "nav", "footer", "header", "form", "svg"]):
-            element.decompose()  # Nuke it from orbit
-
-        # 4. The Distill
-        # get_text with separator='\n' preserves paragraph structure, which LLMs need.
-        text = soup.get_text(separator="\n", strip=True)
-        
-        # 5. The Budget Control (Optional but recommended)
+        resp = fetch_page(url, timeout=timeout)
+
+        # 2. The Distill
+        text = distill(resp.text)
+
+        # 3. The Budget Control (Optional but recommended)
         # Limit to ~2000 words (approx 8-10k characters) to save tokens
-        return text[:10000] 
+        return text[:10000]
 
     except Exception as e:
         return f"[System Error: Failed to scrape {url} - {e}]"
+
+def fetch_tiered(url, timeout=5, validators=None):
+    """
+    Fast tier: HTTP + distill, judged by assess_quality.
+    Returns (text_or_None, reason, meta); None means the page needs the browser tier,
+    or — with reason "not-modified" — that a conditional request came back 304.
+    meta carries the response validators for the next revalidation.
+    """
+    try:
+        resp = fetch_page(url, timeout=timeout, validators=validators)
+    except Exception as e:
+        return None, f"http-error: {e}", {}
+
+    meta = response_validators(resp)
+    if resp.status_code == 304:
+        return None, "not-modified", meta
+
+    content_type = resp.headers.get("Content-Type", "").lower()
+    if "html" not in content_type and "text" not in content_type:
+        meta["content_hash"] = freshness.content_hash(resp.content)
+        if validators and validators.get("content_hash") == meta["content_hash"]:
+            return None, "not-modified", meta
+        return None, "non-html", meta
+
+    html = resp.text
+    text = distill(html)
+    # Hash the distilled text, whitespace-normalized: raw HTML changes on every request
+    # (nonces, timestamps, ads) even when the readable page hasn't
+    meta["content_hash"] = freshness.content_hash(" ".join(text.split()))
+    if validators and validators.get("content_hash") == meta["content_hash"]:
+        return None, "not-modified", meta
+    ok, reason = assess_quality(html, text)
+    return (text if ok else None), reason, meta
@@ -0,0 +1,149 @@
+# /opt/rabid-ui/app_utils/search_cache.py
+import sqlite3
+import hashlib
+import json
+import os
+import time
+
+# --- CONFIGURATION ---
+CACHE_DB = os.environ.get("RABID_SEARCH_CACHE_DB", "/opt/rabid-ui/search_cache.db")
+TTL_SECONDS = int(os.environ.get("RABID_SEARCH_CACHE_TTL", "3600"))
+MAX_ENTRIES = int(os.environ.get("RABID_SEARCH_CACHE_MAX", "2000"))
+
+# Whole conversational phrases at the start or end of a query; dropping them lets near-repeats share
+# an entry. Single words are never stripped on their own ("for loops", "can opener", "look up table"),
+# and words inside the query are kept in order ("python to rust" and "rust to python" differ).
+LEADING_FILLER = [
+    ("please",), ("can", "you"), ("could", "you"), ("tell", "me", "about"), ("search", "for"), ("search", "the", "web", "for"),
+]
+TRAILING_FILLER = [("please",), ("thanks",), ("thank", "you")]
+EDGE_PUNCTUATION = " \t\n?!.,;:"
+
+_initialized = False
+
+def init_cache():
+    """Creates the cache and stats tables on first use."""
+    global _initialized
+    if _initialized:
+        return
+    os.makedirs(os.path.dirname(CACHE_DB), exist_ok=True)
+    with sqlite3.connect(CACHE_DB) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                cache_key TEXT PRIMARY KEY,
+                query TEXT,
+                engines TEXT,
+                language TEXT,
+                results TEXT,
+                created_at REAL,
+                last_access REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER DEFAULT 0
+            )
+        """)
+        conn.commit()
+    _initialized = True
+
+def normalize_query(query):
+    """Lowercases, collapses whitespace and trims edge punctuation and leading/trailing filler; word order is kept."""
+    tokens = [t.strip(EDGE_PUNCTUATION) or t for t in (query or "").lower().split()]
+    start, end = 0, len(tokens)
+    stripped = True
+    while stripped:
+        stripped = False
+        for phrase in LEADING_FILLER:
+            # Only when real words follow: "please" alone stays a query
+            if end - start > len(phrase) and tuple(tokens[start:start + len(phrase)]) == phrase:
+                start += len(phrase)
+                stripped = True
+        for phrase in TRAILING_FILLER:
+            if end - start > len(phrase) and tuple(tokens[end - len(phrase):end]) == phrase:
+                end -= len(phrase)
+                stripped = True
+    return " ".join(tokens[start:end]).strip(EDGE_PUNCTUATION)
+
+def make_key(query, engines, language):
+    engine_set = ",".join(sorted(e.strip() for e in engines.split(",") if e.strip()))
+    raw = f"{normalize_query(query)}|{engine_set}|{language}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def _bump(conn, name):
+    conn.execute(
+        "INSERT INTO search_cache_stats (name, value) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,)
+    )
+
+def get(query, engines, language):
+    """Returns cached SearXNG results if a fresh entry exists, else None."""
+    try:
+        init_cache()
+        key = make_key(query, engines, language)
+        now = time.time()
+        with sqlite3.connect(CACHE_DB) as conn:
+            row = conn.execute(
+                "SELECT results, created_at FROM search_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= TTL_SECONDS:
+                conn.execute("UPDATE search_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+                _bump(conn, "hits")
+                conn.commit()
+                return json.loads(row[0])
+            _bump(conn, "misses")
+            conn.commit()
+    except Exception:
+        pass
+    return None
+
+def put(query, engines, language, results):
+    """Stores a result list and evicts least-recently-used entries beyond MAX_ENTRIES."""
+    try:
+        init_cache()
+        key = make_key(query, engines, language)
+        now = time.time()
+        with sqlite3.connect(CACHE_DB) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (cache_key, query, engines, language, results, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, query, engines, language, json.dumps(results), now, now)
+            )
+            conn.execute(
+                "DELETE FROM search_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM search_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (MAX_ENTRIES,)
+            )
+            conn.execute("DELETE FROM search_cache WHERE created_at < ?", (now - TTL_SECONDS,))
+            conn.commit()
+    except Exception:
+        pass
+
+def get_stats():
+    """Hit/miss counters and current size for the admin console."""
+    try:
+        init_cache()
+        with sqlite3.connect(CACHE_DB) as conn:
+            stats = dict(conn.execute("SELECT name, value FROM search_cache_stats").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+    except Exception:
+        return {"hits": 0, "misses": 0, "entries": 0, "hit_rate": 0.0}
+    hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "entries": entries,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+def clear():
+    """Drops every cached response and resets the counters."""
+    init_cache()
+    with sqlite3.connect(CACHE_DB) as conn:
+        conn.execute("DELETE FROM search_cache")
+        conn.execute("DELETE FROM search_cache_stats")
+        conn.commit()
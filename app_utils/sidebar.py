@@ -1,6 +1,6 @@
 # /opt/rabid-ui/app_utils/sidebar.py
 import streamlit as st
-from . import workspaces, db, bridge
+from . import workspaces, db, bridge, config_loader
 from .sidebar_utils import squad_ui, decision_ui, workspace_ui 
 
 SUPPORTED_LANGUAGES = [
@@ -9,7 +9,7 @@ SUPPORTED_LANGUAGES = [
     "Russian", "Portuguese", "Italian", "Hindi", "Arabic"
 ]
 
-def render(name_pool):
+def render(name_pool, role="user"):
     """Renders the configuration sidebar."""
     username = st.session_state.username
     user_key = st.session_state.get("github_id", username)
@@ -23,13 +23,14 @@ def render(name_pool):
         client = bridge.get_client()
         response = client.list()
         available_models = [m.model for m in response.models] if hasattr(response, 'models') else [m["model"] for m in response.get("models", [])]
+        available_models = config_loader.filter_models(available_models, role=role)
     except Exception as e:
         st.sidebar.error(f"⚠️ Ollama Offline: {str(e)}")
         available_models = []
 
     # 3. Squad
     current_chain = ws_config.get("models", [])
-    squad_ui.render(available_models, current_chain, ws_config.get("locked", False), selected_ws_name, name_pool=name_pool)
+    squad_ui.render(available_models, current_chain, ws_config.get("locked", False), selected_ws_name, name_pool=name_pool, role=role)
     
     selected_mode, final_judge_val = decision_ui.render(
         ws_config, available_models, ws_config.get("locked", False), selected_ws_name
@@ -52,6 +53,31 @@ def render(name_pool):
         help="Grants the model access to real-time web data via SearXNG."
     )
 
+    prompt_budget = st.sidebar.select_slider(
+        "Prompt Budget (tokens)",
+        options=[2048, 4096, 8192, 16384, 32768, 65536],
+        value=8192,
+        help="History, web results and files are trimmed by priority to fit; capped by each model's context window."
+    )
+
+    context_mode = "Full"
+    shard_size, shard_overlap = 4, 1
+    pipelined = False
+    if enable_search:
+        pipelined = st.sidebar.toggle(
+            "Pipelined Turns",
+            value=False,
+            help="Agents start on search snippets right away; deep reads are injected for agents that start later (a single agent gets a refinement pass)."
+        )
+        context_mode = st.sidebar.selectbox(
+            "Web Context Distribution",
+            ["Full", "Sharded"],
+            help="Sharded: each agent reads a seed-determined subset of the sources instead of all of them."
+        )
+        if context_mode == "Sharded":
+            shard_size = st.sidebar.slider("Sources per Agent", 2, 8, 4)
+            shard_overlap = st.sidebar.slider("Shared Sources", 0, shard_size, 1, help="Top-ranked sources every agent sees.")
+
     # 5. Settings
     st.sidebar.divider()
     current_lang = ws_config.get("language", "English")
@@ -82,5 +108,10 @@ def render(name_pool):
         "system_prompt": system_prompt,
         "language": selected_lang,
         "reasoning_mode": enable_reasoning,
-        "web_search": enable_search
+        "web_search": enable_search,
+        "context_mode": context_mode,
+        "shard_size": shard_size,
+        "shard_overlap": shard_overlap,
+        "pipelined": pipelined,
+        "prompt_budget": prompt_budget
     }
\ No newline at end of file
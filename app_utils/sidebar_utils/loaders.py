@@ -1,19 +1,28 @@
 import os
 import json
+import tomllib
+import functools
 import streamlit as st
-from ollama import Client
 
 # --- OLLAMA DOCKER BRIDGE ---
 # Use the internal Docker bridge to access the host's Ollama service and 3090 VRAM
 OLLAMA_HOST = "http://host.docker.internal:11434"
-client = Client(host=OLLAMA_HOST)
+
+@functools.lru_cache(maxsize=1)
+def get_client():
+    """Builds the bridge client on first use rather than at import."""
+    from ollama import Client
+    return Client(host=OLLAMA_HOST)
 
 # --- FILE PATHS (Container Optimized) ---
 # Point directly to the mythological name pool discovered in your sidebar_utils directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 NAMES_FILE = os.path.join(BASE_DIR, "names.json")
 FALLBACK_NAMES = ["Agent_001", "Agent_002", "Agent_003"]
+ART_FILE = os.path.join(BASE_DIR, "..", "art.toml")
 
+# Static assets are read once per process; every session shares the same (read-only) objects.
+@functools.lru_cache(maxsize=1)
 def load_names():
     """Loads mythological names from the 200-entry pool in names.json."""
     if not os.path.exists(NAMES_FILE): 
@@ -39,11 +48,20 @@ def load_names():
     except (json.JSONDecodeError, IOError, Exception): 
         return FALLBACK_NAMES
 
+@functools.lru_cache(maxsize=1)
+def load_art():
+    """Loads the ASCII art pack used for the background watermark."""
+    try:
+        with open(ART_FILE, "rb") as f:
+            return tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError):
+        return {}
+
 def get_installed_models():
     """Fetches local open-weight models from the host bridge using the 3090."""
     try:
         # Communicate with the host machine via the Docker bridge
-        response = client.list()
+        response = get_client().list()
         
         # Handle both object-attribute and dictionary-key response formats
         model_list = response.models if hasattr(response, 'models') else response.get('models', [])
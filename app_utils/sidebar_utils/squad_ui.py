@@ -1,7 +1,7 @@
 import streamlit as st
-from app_utils import workspaces
+from app_utils import workspaces, config_loader
 
-def render(available_models, current_chain, is_locked, selected_ws_name, name_pool):
+def render(available_models, current_chain, is_locked, selected_ws_name, name_pool, role="user"):
     """Renders the Agent Squad using native Streamlit columns for perfect alignment."""
     st.sidebar.divider()
     st.sidebar.subheader("Agent Squad")
@@ -18,6 +18,10 @@ def render(available_models, current_chain, is_locked, selected_ws_name, name_po
             new_model = st.selectbox("Add Model", available_models, key="squad_add_sel", disabled=limit_reached)
         with c2:
             if st.button("➕", key="squad_add_btn", disabled=limit_reached, use_container_width=True):
+                # Re-check in case the policy file changed since the catalog was rendered
+                if not config_loader.is_model_allowed(new_model, role):
+                    st.sidebar.error(f"🚫 {new_model} is not permitted by the model policy.")
+                    return
                 new_agent = workspaces.generate_identity(new_model, name_pool, [m['name'] for m in current_chain])
                 current_chain.append(new_agent)
                 workspaces.update(user_key, selected_ws_name, models=current_chain)
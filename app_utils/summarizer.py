@@ -0,0 +1,90 @@
+# /opt/rabid-ui/app_utils/summarizer.py
+# Rolling per-session summary. After each turn, messages that have aged out of the raw
+# history tail are folded into the stored summary by a small model on a background thread.
+import concurrent.futures
+import os
+import threading
+import time
+from app_utils import db, context_sizing, render_cache
+
+# --- CONFIGURATION ---
+SUMMARY_MODEL = os.environ.get("RABID_SUMMARY_MODEL", "qwen2.5:7b")  # Falls back to the session's own model
+RAW_TAIL = 8            # Newest messages always sent verbatim; everything older lives in the summary
+MIN_BATCH = 2           # Fold once at least one full turn (user + assistant) has aged out
+MESSAGE_CHAR_CAP = 2000
+SUMMARY_TOKENS = 600    # Target length of the summary; keeps its prompt cost flat as the session grows
+
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="rabid-summary")
+_in_flight = set()
+_lock = threading.Lock()
+
+def _fold_prompt(previous, new_messages):
+    transcript = "\n".join(
+        f"{'User' if m['role'] == 'user' else 'Assistant'}: {render_cache.compact_text(m['content'])[:MESSAGE_CHAR_CAP]}"
+        for m in new_messages
+    )
+    return f"""
+    You maintain the running memory of a long conversation.
+    Merge the NEW MESSAGES into the EXISTING SUMMARY.
+
+    EXISTING SUMMARY:
+    {previous or "(none yet)"}
+
+    NEW MESSAGES:
+    {transcript}
+
+    INSTRUCTIONS:
+    - Keep facts, decisions, user preferences, names, numbers and open questions.
+    - Drop pleasantries, repetition and superseded details.
+    - Stay under {SUMMARY_TOKENS} tokens. Plain bullet points, no preamble.
+    """
+
+def log(msg):
+    print(f"[summarizer] {time.strftime('%H:%M:%S')} {msg}", flush=True)
+
+def update_summary(client, session_id, fallback_model=None):
+    """
+    Folds any messages older than the raw tail into the session's summary (blocking).
+    Tries SUMMARY_MODEL first, then fallback_model (e.g. when the small model isn't pulled).
+    """
+    history = db.load_history(session_id)
+    record = db.get_summary(session_id) or {"summary": "", "covered_id": 0}
+    pending = [m for m in history if m["id"] > record["covered_id"]]
+    fold = pending[:max(0, len(pending) - RAW_TAIL)]
+    if len(fold) < MIN_BATCH:
+        return False
+
+    prompt = _fold_prompt(record["summary"], fold)
+    models = [SUMMARY_MODEL] + ([fallback_model] if fallback_model and fallback_model != SUMMARY_MODEL else [])
+    for i, model in enumerate(models):
+        try:
+            response = client.chat(
+                model=model,
+                messages=[{'role': 'user', 'content': prompt}],
+                options=context_sizing.options_for(model, prompt, output_tokens=SUMMARY_TOKENS, options={"temperature": 0.1})
+            )
+        except Exception as e:
+            if i == len(models) - 1:
+                raise
+            log(f"⚠️ {model} failed ({e}); retrying with {models[i + 1]}")
+            continue
+        db.save_summary(session_id, response['message']['content'].strip(), fold[-1]["id"])
+        return True
+
+def _run(client, session_id, fallback_model):
+    try:
+        update_summary(client, session_id, fallback_model)
+    except Exception as e:
+        # Nothing is saved, so the next turn retries from the same covered_id
+        log(f"❌ Summary update failed for {session_id}: {e}")
+    finally:
+        with _lock:
+            _in_flight.discard(session_id)
+
+def schedule_update(client, session_id, fallback_model=None):
+    """Queues a summary update off the request path; one in flight per session at a time."""
+    with _lock:
+        if session_id in _in_flight:
+            return
+        _in_flight.add(session_id)
+    _executor.submit(_run, client, session_id, fallback_model)
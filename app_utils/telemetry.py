@@ -0,0 +1,192 @@
+# /opt/rabid-ui/app_utils/telemetry.py
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import deque
+
+# --- CONFIGURATION ---
+# "auto" tries NVML first, then nvidia-smi. "fake" is for boxes without a GPU.
+BACKEND = os.environ.get("RABID_GPU_BACKEND", "auto").lower()
+SAMPLE_INTERVAL = float(os.environ.get("RABID_GPU_INTERVAL", "1.0"))
+HISTORY_LENGTH = 60  # One minute of samples at the default interval
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+# --- BACKENDS ---
+# Every backend exposes read() -> list of dicts:
+# {"name", "temp", "load", "mem_used", "mem_total"} (MB / % / °C)
+
+class NvmlSource:
+    """Reads GPU stats in-process through NVML (no fork per sample)."""
+    name = "nvml"
+
+    def __init__(self):
+        import pynvml  # Optional: nvidia-ml-py
+        pynvml.nvmlInit()
+        self.nvml = pynvml
+        self.handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+
+    def read(self):
+        nv = self.nvml
+        gpus = []
+        for h in self.handles:
+            name = nv.nvmlDeviceGetName(h)
+            if isinstance(name, bytes):
+                name = name.decode("utf-8", errors="ignore")
+            mem = nv.nvmlDeviceGetMemoryInfo(h)
+            gpus.append({
+                "name": name,
+                "temp": nv.nvmlDeviceGetTemperature(h, nv.NVML_TEMPERATURE_GPU),
+                "load": nv.nvmlDeviceGetUtilizationRates(h).gpu,
+                "mem_used": mem.used // (1024 * 1024),
+                "mem_total": mem.total // (1024 * 1024),
+            })
+        return gpus
+
+class NvidiaSmiSource:
+    """Legacy path: one nvidia-smi fork per sample (but only one sampler per process)."""
+    name = "nvidia-smi"
+    CMD = "nvidia-smi --query-gpu=name,temperature.gpu,utilization.gpu,memory.used,memory.total --format=csv,noheader,nounits"
+
+    def read(self):
+        output = subprocess.check_output(self.CMD.split(), timeout=5).decode("utf-8").strip().split("\n")
+        gpus = []
+        for line in output:
+            parts = [x.strip() for x in line.split(',')]
+            if len(parts) == 5:
+                name, temp, load, mem_used, mem_total = parts
+                gpus.append({
+                    "name": name,
+                    "temp": int(temp),
+                    "load": int(load),
+                    "mem_used": int(mem_used),
+                    "mem_total": int(mem_total),
+                })
+        return gpus
+
+class FakeSource:
+    """Synthetic 3090 that wanders around so the HUD can be exercised without a GPU."""
+    name = "fake"
+
+    def __init__(self, count=1, mem_total=24576, seed=None):
+        self.rng = random.Random(seed)
+        self.state = [{"load": 10, "mem_used": 2048} for _ in range(count)]
+        self.mem_total = mem_total
+
+    def read(self):
+        gpus = []
+        for s in self.state:
+            s["load"] = max(0, min(100, s["load"] + self.rng.randint(-15, 15)))
+            s["mem_used"] = max(0, min(self.mem_total, s["mem_used"] + self.rng.randint(-512, 512)))
+            gpus.append({
+                "name": "Fake RTX 3090",
+                "temp": 40 + s["load"] // 3,
+                "load": s["load"],
+                "mem_used": s["mem_used"],
+                "mem_total": self.mem_total,
+            })
+        return gpus
+
+def make_source(backend=BACKEND):
+    """Resolves a backend name into a source object ("auto" falls back NVML -> nvidia-smi)."""
+    if backend == "fake":
+        return FakeSource()
+    if backend == "nvidia-smi":
+        return NvidiaSmiSource()
+    try:
+        return NvmlSource()
+    except Exception:
+        if backend == "nvml":
+            raise
+        return NvidiaSmiSource()
+
+# --- SAMPLER ---
+
+class GpuSampler:
+    """
+    One background thread per process polls the source and keeps a ring buffer.
+    Browser sessions only read snapshots, so ten open tabs cost one sample per tick.
+    """
+
+    def __init__(self, source, interval=SAMPLE_INTERVAL, history=HISTORY_LENGTH):
+        self.source = source
+        self.interval = interval
+        self.history = deque(maxlen=history)
+        self.error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rabid-gpu-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def sample(self):
+        """Takes one reading and appends it to the history."""
+        try:
+            gpus = self.source.read()
+            with self._lock:
+                self.history.append({"time": time.time(), "gpus": gpus})
+                self.error = None
+        except Exception as e:
+            with self._lock:
+                self.error = str(e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def latest(self):
+        """Returns the most recent snapshot or None if nothing has been sampled yet."""
+        with self._lock:
+            return self.history[-1] if self.history else None
+
+    def series(self, gpu_index, field):
+        """Returns the recorded history of one field for one GPU, oldest first."""
+        with self._lock:
+            snapshots = list(self.history)
+        return [s["gpus"][gpu_index][field] for s in snapshots if gpu_index < len(s["gpus"])]
+
+_SAMPLER = None
+_SAMPLER_LOCK = threading.Lock()
+
+def get_sampler():
+    """Returns the process-wide sampler, starting it on first use."""
+    global _SAMPLER
+    with _SAMPLER_LOCK:
+        if _SAMPLER is None:
+            try:
+                source = make_source()
+            except Exception:
+                return None
+            _SAMPLER = GpuSampler(source).start()
+        return _SAMPLER
+
+# --- HELPERS ---
+
+def vram_headroom_mb():
+    """Free VRAM across all GPUs from the latest sample, in MB; None when nothing has been measured."""
+    sampler = get_sampler()
+    snapshot = sampler.latest() if sampler else None
+    if not snapshot or not snapshot["gpus"]:
+        return None
+    return sum(max(0, g["mem_total"] - g["mem_used"]) for g in snapshot["gpus"])
+
+def sparkline(values, lo=None, hi=None):
+    """Renders a list of numbers as a compact unicode sparkline."""
+    if not values:
+        return ""
+    lo = min(values) if lo is None else lo
+    hi = max(values) if hi is None else hi
+    span = (hi - lo) or 1
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[max(0, min(top, int((v - lo) / span * top)))] for v in values)
@@ -0,0 +1,89 @@
+# /opt/rabid-ui/app_utils/tokens.py
+import math
+
+# --- CONFIGURATION ---
+CHARS_PER_TOKEN = 4.0  # Rough average for English prose on Llama/Gemma-style tokenizers
+
+# Per-family averages (English prose). Bigger vocabularies pack more characters per token.
+# Matched as prefixes of the model name with any registry namespace stripped; first match wins.
+FAMILY_CHARS_PER_TOKEN = [
+    ("gemma", 4.2),       # 256k vocab
+    ("qwen", 3.9),
+    ("llama3", 4.0),
+    ("llama", 3.6),       # Llama 2 era 32k vocab
+    ("mistral", 3.7),
+    ("mixtral", 3.7),
+    ("deepseek", 3.9),
+    ("phi", 3.8),
+    ("gpt-oss", 4.1),
+    ("command-r", 4.1),
+]
+
+# Trained context lengths, used to cap prompt budgets for models that can't take the configured one
+FAMILY_CONTEXT = [
+    ("gemma3", 131072),
+    ("gemma2", 8192),
+    ("gemma", 8192),
+    ("qwen", 32768),
+    ("llama3.1", 131072),
+    ("llama3.2", 131072),
+    ("llama3.3", 131072),
+    ("llama3", 8192),
+    ("llama", 4096),
+    ("mistral", 32768),
+    ("mixtral", 32768),
+    ("deepseek-coder-v2", 131072),
+    ("deepseek-coder", 16384),   # v1 (e.g. deepseek-coder:33b)
+    ("deepseek-r1", 131072),
+    ("deepseek-v3", 131072),
+    ("deepseek-v2", 131072),
+    ("deepseek-llm", 4096),
+    ("phi4", 16384),
+    ("phi", 4096),
+    ("gpt-oss", 131072),
+    ("command-r", 131072),
+]
+DEFAULT_CONTEXT = 8192
+
+NON_ASCII_CHARS_PER_TOKEN = 1.5  # Accents, CJK, emoji: usually split into byte-level pieces
+
+def family(model):
+    """Model family key: 'hf.co/org/Qwen2.5-7B:Q4' -> 'qwen2.5-7b'."""
+    if not model:
+        return ""
+    name = str(model).lower().rsplit("/", 1)[-1]
+    return name.split(":", 1)[0]
+
+def _lookup(table, model, default):
+    name = family(model)
+    for prefix, value in table:
+        if name.startswith(prefix):
+            return value
+    return default
+
+def chars_per_token(model=None):
+    return _lookup(FAMILY_CHARS_PER_TOKEN, model, CHARS_PER_TOKEN)
+
+def context_window(model=None):
+    return _lookup(FAMILY_CONTEXT, model, DEFAULT_CONTEXT)
+
+def estimate(text, model=None):
+    """Cheap token estimate used for budgeting (no tokenizer round-trip)."""
+    if not text:
+        return 0
+    non_ascii = sum(1 for c in text if ord(c) > 127) if not text.isascii() else 0
+    return math.ceil((len(text) - non_ascii) / chars_per_token(model) + non_ascii / NON_ASCII_CHARS_PER_TOKEN)
+
+def truncate(text, max_tokens, model=None):
+    """Cuts text to roughly max_tokens, preferring a line or sentence boundary."""
+    if estimate(text, model) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    # Scale the cut by the text's own density so non-ASCII heavy text isn't overshot
+    limit = int(len(text) * max_tokens / estimate(text, model))
+    cut = text[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(". "))
+    if boundary > limit * 0.6:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " …"
@@ -0,0 +1,120 @@
+# /opt/rabid-ui/app_utils/upload_cache.py
+# Extraction results (text, OCR output, archive members) keyed by the SHA-256 of the uploaded
+# bytes, so files that stay attached across turns are hashed, not re-read, re-OCR'd or re-written.
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.environ.get(
+    "RABID_UPLOAD_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", "user_data", "upload_cache")
+)
+MAX_BYTES = int(float(os.environ.get("RABID_UPLOAD_CACHE_MB", "256")) * 1024 * 1024)
+MEMORY_ENTRIES = 64   # Hot entries kept decoded in memory
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_stream(fileobj, chunk_size=1024 * 1024):
+    """content_hash of a seekable file object, read in chunks (rewound before and after)."""
+    h = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        h.update(chunk)
+    fileobj.seek(0)
+    return h.hexdigest()
+
+def _path(digest):
+    return os.path.join(CACHE_DIR, f"{digest}.json")
+
+def _remember(digest, entry):
+    with _lock:
+        _memory[digest] = entry
+        _memory.move_to_end(digest)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+def get(digest):
+    """Cached entry {"docs", "paths"} for a content hash, or None."""
+    with _lock:
+        entry = _memory.get(digest)
+        if entry is not None:
+            _memory.move_to_end(digest)
+            return entry
+    path = _path(digest)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(path)  # mtime doubles as last-use for eviction
+    except (OSError, ValueError):
+        return None
+    _remember(digest, entry)
+    return entry
+
+def put(digest, docs, saved_path=None):
+    """Stores extraction output for a content hash, then evicts least-recently-used entries over MAX_BYTES."""
+    entry = get(digest) or {"docs": docs, "paths": []}
+    entry["docs"] = docs
+    if saved_path and saved_path not in entry["paths"]:
+        entry["paths"].append(saved_path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = _path(digest) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp, _path(digest))
+    _remember(digest, entry)
+    evict()
+    return entry
+
+def record_path(digest, saved_path):
+    """Notes that the file with this hash now also lives at saved_path."""
+    entry = get(digest)
+    if entry is not None and saved_path not in entry["paths"]:
+        put(digest, entry["docs"], saved_path)
+
+def already_on_disk(digest, saved_path, size):
+    """
+    True when saved_path holds exactly these bytes (so the write can be skipped). The file is
+    re-hashed: a different upload with the same name may have overwritten it since it was recorded.
+    """
+    entry = get(digest)
+    if not entry or saved_path not in entry["paths"]:
+        return False
+    try:
+        if os.path.getsize(saved_path) != size:
+            return False
+        with open(saved_path, "rb") as f:
+            return hash_stream(f) == digest
+    except OSError:
+        return False
+
+def evict(max_bytes=MAX_BYTES):
+    """Deletes the least recently used entries until the cache directory fits max_bytes."""
+    try:
+        files = [os.path.join(CACHE_DIR, n) for n in os.listdir(CACHE_DIR) if n.endswith(".json")]
+        stats = [(p, os.stat(p)) for p in files]
+    except OSError:
+        return
+    total = sum(s.st_size for _, s in stats)
+    for path, stat in sorted(stats, key=lambda item: item[1].st_mtime):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= stat.st_size
+        with _lock:
+            _memory.pop(os.path.basename(path)[:-5], None)
+
+def get_stats():
+    try:
+        files = [os.path.join(CACHE_DIR, n) for n in os.listdir(CACHE_DIR) if n.endswith(".json")]
+        return {"entries": len(files), "bytes": sum(os.path.getsize(p) for p in files), "max_bytes": MAX_BYTES}
+    except OSError:
+        return {"entries": 0, "bytes": 0, "max_bytes": MAX_BYTES}
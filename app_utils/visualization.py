@@ -1,6 +1,4 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 import ast
 import re
 
@@ -8,6 +6,8 @@ def parse_voting_logs(logs):
     """
     Converts text logs into a structured DataFrame for graphing.
     """
+    import pandas as pd
+
     data = []
     for entry in logs:
         # We only care about lines starting with "Round"
@@ -40,6 +40,8 @@ def render_voting_chart(logs):
     Renders an interactive Donut Chart of the voting rounds.
     Includes a slider to scrub through the history of the vote.
     """
+    import altair as alt
+
     df = parse_voting_logs(logs)
     
     if df.empty:
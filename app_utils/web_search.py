@@ -1,77 +1,177 @@
 # /opt/rabid-ui/app_utils/web_search.py
-import httpx
 import concurrent.futures
-import sqlite3
 import subprocess
 import os
 import sys
+import threading
+import time
+from urllib.parse import urlsplit
+from app_utils import search_cache, scrape_queue, scrape_cache, scraper, db, passages, dedupe, freshness, http_pool, context_sizing
 
 # --- CONFIGURATION ---
 SEARXNG_URL = os.environ.get("SEARXNG_URL", "http://localhost:8080")
 TIMEOUT = 5.0
 MAX_DEEP_READS = 3
-MAX_CHARS_PER_PAGE = 8000
+MAX_CHARS_PER_PAGE = 200000  # Raw cap on a fetched page; prompts only get ranked passages
+TOKENS_PER_SOURCE = 1200     # Passage budget per deep-read source
+SPECULATIVE_READS = 2  # Deep reads started on raw-query hits before the rewritten query returns
+SPECULATIVE_WINDOW = 5       # Only raw hits this high up are considered for speculative reads
+SPECULATIVE_MIN_ENGINES = 2  # ...and only when this many engines agree on them
+SEARCH_ENGINES = "google,bing,duckduckgo,wikipedia"
+SEARCH_LANGUAGE = "en-US"
+SEARCH_BUDGET = float(os.environ.get("RABID_SEARCH_BUDGET", "12"))  # Seconds per turn before late sources fall back to snippets
+SEARCH_WORKERS = 8    # SearXNG queries + LLM rewrites (never shares threads with scrapes)
+SCRAPE_WORKERS = 8    # Deep reads, shared by every session; stragglers keep running past their turn
+MAX_QUEUED_SCRAPES = 16  # Running + waiting deep reads; past this, new sources stay snippet-only
+SHARD_POOL_SIZE = 12  # Distinct sources kept for per-agent sharding
 
 # --- INTEGRATION WITH RABID-SCRAPE ---
 SCRAPER_ROOT = "/opt/rabid-scrape"
-DB_PATH = os.path.join(SCRAPER_ROOT, "scrapes.db")
 PYTHON_EXEC = os.path.join(SCRAPER_ROOT, "venv/bin/python")
 MAIN_SCRIPT = os.path.join(SCRAPER_ROOT, "main.py")
+SCRAPE_DEADLINE = 30.0  # Seconds to wait on a daemon job before giving up on the URL
 
 def get_from_db(url):
     """Retrieve the latest scrape content for a URL from the shared database."""
-    if not os.path.exists(DB_PATH):
-        return None
-        
     try:
-        # Connect strictly read-only to avoid locking
-        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT content FROM scrapes 
-            WHERE url = ? 
-            ORDER BY timestamp DESC 
-            LIMIT 1
-        ''', (url,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return row[0]
-        return None
-    except Exception as e:
+        return scrape_cache.lookup(url)
+    except Exception:
         return None
 
+def _revalidated_at(record):
+    """
+    Times a fetch_cache record proves the page current. HTTP records hold the text itself, so their
+    fetch counts; browser records only vouch for the scrape once a 304/same-hash check has passed.
+    """
+    if not record:
+        return ()
+    if record["tier"] == "http":
+        return (record.get("fetched_at"), record.get("checked_at"))
+    return (record.get("checked_at"),)
+
+def cached_pages(urls):
+    """
+    One batched pass over both caches: fast-tier text in rabidui.db, then browser scrapes in scrapes.db.
+    Returns {url: content} for every URL whose cached copy is still within its domain TTL;
+    stale and missing URLs are left to scrape_url, which revalidates them.
+    """
+    pages = {}
+    records = {}
+    keys = {}
+    try:
+        keys = {u: scrape_cache.normalize_url(u) for u in urls}
+        records = db.get_fetch_records(list(set(keys.values())))
+        for u, key in keys.items():
+            rec = records.get(key)
+            if rec and rec["tier"] == "http" and rec["content"] and freshness.is_fresh(u, *_revalidated_at(rec)):
+                pages[u] = rec["content"]
+    except Exception:
+        pass
+
+    missing = [u for u in urls if u not in pages]
+    try:
+        for u, (content, scraped_at) in scrape_cache.lookup_many(missing, with_timestamp=True).items():
+            rec = records.get(keys.get(u))
+            if freshness.is_fresh(u, scraped_at, *_revalidated_at(rec if rec and rec["tier"] == "browser" else None)):
+                pages[u] = content
+    except Exception:
+        pass
+    return pages
+
 def scrape_url(url):
     """
-    Leverages the 'rabid-scrape' engine (Playwright/OCR).
+    Tiered fetch: cheap HTTP + distill first; escalates to the 'rabid-scrape'
+    engine (Playwright/OCR) only when the quality heuristic rejects the page.
+    The tier a URL needed is remembered so repeat visits skip straight to it.
+    Cached copies past their domain TTL are revalidated with a conditional GET
+    (ETag / Last-Modified, else content hash) and only refetched if the page changed.
     """
     if not url or url.startswith('#') or url.startswith('/'): 
         return None
 
-    # 1. Check Cache First
-    cached_content = get_from_db(url)
-    if cached_content:
-        return cached_content[:MAX_CHARS_PER_PAGE]
+    # 1. Check Cache First (fast-tier text, then browser scrapes)
+    url_key = scrape_cache.normalize_url(url)
+    try:
+        record = db.get_fetch_records([url_key]).get(url_key)
+    except Exception:
+        record = None
+    try:
+        browser_hit = scrape_cache.lookup(url, with_timestamp=True)
+    except Exception:
+        browser_hit = None
+
+    stale = None
+    if record and record["tier"] == "http" and record["content"]:
+        if freshness.is_fresh(url, *_revalidated_at(record)):
+            return record["content"][:MAX_CHARS_PER_PAGE]
+        stale = record["content"]
+    elif browser_hit:
+        content, scraped_at = browser_hit
+        browser_record = record if record and record["tier"] == "browser" else None
+        if freshness.is_fresh(url, scraped_at, *_revalidated_at(browser_record)):
+            return content[:MAX_CHARS_PER_PAGE]
+        stale = content
+
+    # 2. Fast Tier: revalidates a stale copy, or tries plain HTTP first.
+    # Skipped for URLs known to need a browser when there is nothing to revalidate
+    # (older rows recorded after a mere HTTP error don't count: those are retried).
+    fast_text = None
+    known_browser = record and record["tier"] == "browser" and not (record["reason"] or "").startswith("http-error")
+    if stale or not known_browser:
+        validators = record if stale and record else None
+        fast_text, reason, meta = scraper.fetch_tiered(url, timeout=TIMEOUT, validators=validators)
+        try:
+            if reason == "not-modified":
+                db.touch_fetch_record(url_key, meta)
+                return stale[:MAX_CHARS_PER_PAGE]
+            if stale and record and record["tier"] == "http" and reason.startswith("http-error"):
+                return stale[:MAX_CHARS_PER_PAGE]  # Origin unreachable: a stale copy beats nothing
+            if fast_text:
+                db.save_fetch_record(url_key, url, "http", reason, fast_text, validators=meta)
+                return fast_text[:MAX_CHARS_PER_PAGE]
+            # Only a real verdict on the page (quality heuristic, non-HTML) pins the browser tier;
+            # HTTP errors are often transient, so the cheap path is tried again next time
+            if not reason.startswith("http-error"):
+                db.save_fetch_record(url_key, url, "browser", reason, validators=meta)
+        except Exception:
+            if fast_text:
+                return fast_text[:MAX_CHARS_PER_PAGE]
+            if reason == "not-modified":
+                return stale[:MAX_CHARS_PER_PAGE]
+
+    # 3. Browser Tier: hand the URL to the warm scraper daemon when it is running
+    if scrape_queue.daemon_alive():
+        try:
+            job_id = scrape_queue.submit(url)
+            job = scrape_queue.wait(job_id, deadline=time.time() + SCRAPE_DEADLINE)
+            if job is None:
+                return "[System: Scraper job timed out]"
+            if job["status"] == "failed":
+                return f"[System: Scraper Job Failed - {job['error']}]"
+            content = get_from_db(url)
+            return content[:MAX_CHARS_PER_PAGE] if content else "[System: Scraper ran but produced no content]"
+        except Exception:
+            pass  # Queue unavailable: fall through to a one-off process
 
-    # 2. Trigger External Scraper
+    # 4. Browser Tier fallback: cold process per URL
     try:
         subprocess.run(
             [PYTHON_EXEC, MAIN_SCRIPT, url],
             check=True,
             stdout=subprocess.DEVNULL,
-            stderr=subprocess.PIPE
+            stderr=subprocess.PIPE,
+            timeout=SCRAPE_DEADLINE
         )
         
-        # 3. Fetch Result
+        # 5. Fetch Result
         content = get_from_db(url)
         if content:
             return content[:MAX_CHARS_PER_PAGE]
         else:
             return "[System: Scraper ran but produced no content]"
             
+    except subprocess.TimeoutExpired:
+        return f"[System: Scraper Process timed out after {SCRAPE_DEADLINE:.0f}s]"
     except subprocess.CalledProcessError as e:
         return f"[System: Scraper Process Failed - {e.stderr.decode().strip()}]"
     except Exception as e:
@@ -110,91 +210,300 @@ def generate_optimized_query(raw_prompt, history, client, model="gemma3:27b"):
         response = client.chat(
             model=model, 
             messages=[{'role': 'user', 'content': system_prompt}],
-            options={"temperature": 0.1}
+            options=context_sizing.options_for(model, system_prompt, output_tokens=64, options={"temperature": 0.1})
         )
         return response['message']['content'].strip().strip('"')
     except Exception as e:
         return raw_prompt
 
-def search(query, num_results=8, client=None, history=None, model="gemma3:27b"):
+def query_searxng(query):
+    """Runs one SearXNG JSON query (or serves it from the local cache) and returns its result list."""
+    cached = search_cache.get(query, SEARCH_ENGINES, SEARCH_LANGUAGE)
+    if cached is not None:
+        return cached
+
+    headers = {"User-Agent": "RabidUI-Agent/1.0"}
+    params = {
+        "q": query,
+        "format": "json",
+        "engines": SEARCH_ENGINES,
+        "safesearch": 0,
+        "language": SEARCH_LANGUAGE
+    }
+
+    response = http_pool.get(f"{SEARXNG_URL}/search", headers=headers, params=params, timeout=TIMEOUT, retries=1)
+    response.raise_for_status()
+    results = response.json().get("results", [])
+    if results:
+        search_cache.put(query, SEARCH_ENGINES, SEARCH_LANGUAGE, results)
+    return results
+
+def is_high_confidence(result, rank):
+    """A raw-query hit worth deep-reading before the rewritten query is back: near the top and found by several engines."""
+    return rank < SPECULATIVE_WINDOW and len(result.get("engines", [])) >= SPECULATIVE_MIN_ENGINES
+
+def merge_results(primary, secondary):
+    """Interleaves two ranked result lists and drops repeated URLs (first occurrence wins)."""
+    merged = []
+    seen_urls = set()
+    for i in range(max(len(primary), len(secondary))):
+        for results in (primary, secondary):
+            if i < len(results):
+                u = results[i].get("url")
+                if u and u not in seen_urls:
+                    merged.append(results[i])
+                    seen_urls.add(u)
+    return merged
+
+_EXECUTOR = None
+_SCRAPE_EXECUTOR = None
+_scrapes = {}   # url -> future of the deep read in flight (shared across sessions)
+_scrapes_lock = threading.Lock()
+
+def get_executor():
+    """Process-wide pool for SearXNG queries and query rewrites (short, bounded calls only)."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="rabid-search")
+    return _EXECUTOR
+
+def get_scrape_executor():
+    """Process-wide pool for deep reads; kept apart so slow scrapes can't starve searches."""
+    global _SCRAPE_EXECUTOR
+    if _SCRAPE_EXECUTOR is None:
+        _SCRAPE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=SCRAPE_WORKERS, thread_name_prefix="rabid-scrape")
+    return _SCRAPE_EXECUTOR
+
+def submit_scrape(url):
+    """
+    Starts a deep read, or joins the one already running for this URL. Returns None when
+    MAX_QUEUED_SCRAPES reads are already running or waiting (the source stays snippet-only).
+    """
+    with _scrapes_lock:
+        future = _scrapes.get(url)
+        if future is not None:
+            return future
+        if len(_scrapes) >= MAX_QUEUED_SCRAPES:
+            return None
+        future = get_scrape_executor().submit(scrape_url, url)
+        _scrapes[url] = future
+
+    def release(_):
+        with _scrapes_lock:
+            if _scrapes.get(url) is future:
+                del _scrapes[url]
+    future.add_done_callback(release)
+    return future
+
+def gather(query, client=None, history=None, model="gemma3:27b", budget=SEARCH_BUDGET, wait=True):
     """
-    Main Entry Point:
-    1. Optimizes query using LLM (if client provided).
-    2. Gets JSON snippets from SearXNG.
-    3. Spawns threads to Deep-Scrape the top N results using rabid-scrape.
-    4. Combines everything into a context block.
+    Runs the search pipeline under a per-turn time budget and returns the raw intelligence:
+    {"query", "note", "results", "scraped": {url: text}, "late": [urls still being read], "pending": {url: future}}.
+    1. Starts the raw-query SearXNG lookup and the LLM query rewrite together.
+    2. Deep-reads high-confidence raw hits while the rewrite is still in flight.
+    3. Searches the rewritten query, merges both result sets (deduped by URL) and tops up deep reads.
+    4. Stops waiting at the deadline; late scrapes keep running and fill the cache for the next turn.
+    With wait=False (pipelined turns) step 4 is skipped: the caller gets snippets right away
+    and pulls deep reads in with refresh() as they land.
     """
+    deadline = time.time() + budget
+    executor = get_executor()
+    final_query = query
+    optimization_note = ""
+
+    # --- PHASE 1: SPECULATIVE SEARCH (PARALLEL) ---
+    raw_future = executor.submit(query_searxng, query)
+    optimize_future = executor.submit(generate_optimized_query, query, history, client, model) if client else None
+
+    raw_error = None
     try:
-        final_query = query
-        optimization_note = ""
-        
-        if client:
-            final_query = generate_optimized_query(query, history, client, model)
-            if final_query != query:
-                optimization_note = f" (Optimized from: '{query}')"
-
-        headers = {"User-Agent": "RabidUI-Agent/1.0"}
-        params = {
-            "q": final_query,
-            "format": "json",
-            "engines": "google,bing,duckduckgo,wikipedia",
-            "safesearch": 0,
-            "language": "en-US"
-        }
-        
-        response = httpx.get(f"{SEARXNG_URL}/search", headers=headers, params=params, timeout=TIMEOUT)
-        response.raise_for_status()
-        
-        data = response.json()
-        results = data.get("results", [])
-
-        if not results:
-            return f"[System Log]: Search for '{final_query}' returned 0 results."
-
-        # --- PHASE 2: DEEP READ (PARALLEL) ---
-        deep_read_targets = []
-        seen_urls = set()
-        for res in results:
-            u = res.get("url")
-            if u and u not in seen_urls:
-                deep_read_targets.append(u)
-                seen_urls.add(u)
-            if len(deep_read_targets) >= MAX_DEEP_READS:
-                break
-
-        scraped_data = {} 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_DEEP_READS) as executor:
-            future_to_url = {executor.submit(scrape_url, url): url for url in deep_read_targets}
-            for future in concurrent.futures.as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    data = future.result()
-                    scraped_data[url] = data
-                except Exception:
-                    scraped_data[url] = None
-
-        # --- PHASE 3: REPORT GENERATION ---
-        context_str = f"--- BEGIN WEB INTELLIGENCE FOR: '{final_query}'{optimization_note} ---\n"
-        
-        for i, res in enumerate(results[:num_results]):
-            title = res.get("title", "No Title")
-            url = res.get("url", "#")
-            snippet = res.get("content", "No snippet available.")
-            
-            context_str += f"\n=== SOURCE {i+1}: {title} ===\n"
-            context_str += f"URL: {url}\n"
-            
-            if url in scraped_data and scraped_data[url]:
-                context_str += f"STATUS: [FULL SCRAPE (PLAYWRIGHT/OCR)]\n"
-                context_str += f"--- START CONTENT ---\n{scraped_data[url]}\n--- END CONTENT ---\n"
+        raw_results = raw_future.result(timeout=max(0.1, deadline - time.time()))
+    except Exception as e:
+        raw_results, raw_error = [], e
+
+    scraped_data = {}
+    future_to_url = {}
+
+    def schedule(urls):
+        """Serves cached pages from one batched lookup; only misses go to the scraper."""
+        cached = cached_pages(urls)
+        for u in urls:
+            if u in cached:
+                scraped_data[u] = cached[u][:MAX_CHARS_PER_PAGE]
             else:
-                context_str += f"STATUS: [SNIPPET ONLY]\n"
-                context_str += f"CONTENT: {snippet}\n"
-            
-            context_str += "-" * 40
+                future = submit_scrape(u)
+                if future is not None:
+                    future_to_url[u] = future
+
+    speculative = []
+    for rank, res in enumerate(raw_results):
+        u = res.get("url")
+        if len(speculative) >= SPECULATIVE_READS:
+            break
+        if u and u not in speculative and is_high_confidence(res, rank):
+            speculative.append(u)
+    schedule(speculative)
+
+    results = raw_results
+    if optimize_future:
+        try:
+            final_query = optimize_future.result(timeout=max(0.1, deadline - time.time()))
+        except Exception:
+            final_query = query  # Rewrite missed the budget: go with the raw query
+        if final_query != query:
+            optimization_note = f" (Optimized from: '{query}')"
+            # On the executor, so a slow SearXNG can't hold the turn past its budget
+            try:
+                optimized = executor.submit(query_searxng, final_query).result(timeout=max(0.1, deadline - time.time()))
+                results = merge_results(optimized, raw_results)
+            except Exception:
+                pass  # Late or failed: the raw-query results stand
+
+    if not results and raw_error:
+        if isinstance(raw_error, concurrent.futures.TimeoutError):
+            raise TimeoutError(f"SearXNG did not answer within {budget:.0f}s")
+        raise raw_error
 
-        context_str += "\n--- END WEB INTELLIGENCE ---\n"
-        return context_str
+    # Mirrors and syndicated copies usually share their snippet: drop them before spending deep reads
+    results, snippet_dupes = dedupe.unique(results, lambda r: f"{r.get('title', '')} {r.get('content', '')}")
+
+    # --- PHASE 2: DEEP READ (PARALLEL, DEADLINE-BOUNDED) ---
+    remaining = []
+    for res in results:
+        if len(speculative) + len(remaining) >= MAX_DEEP_READS:
+            break
+        u = res.get("url")
+        if u and u not in speculative and u not in remaining:
+            remaining.append(u)
+    schedule(remaining)
+
+    if wait:
+        concurrent.futures.wait(list(future_to_url.values()), timeout=max(0.0, deadline - time.time()))
+
+    intel = {
+        "query": final_query,
+        "note": optimization_note,
+        "results": results,
+        "scraped": scraped_data,
+        "late": [],
+        "pending": future_to_url,
+        "deadline": deadline,
+        "duplicates": [(d.get("url"), k.get("url")) for d, k in snippet_dupes],
+    }
+    refresh(intel)
+    return intel
+
+def refresh(intel, timeout=0.0):
+    """
+    Moves finished deep reads from intel["pending"] into intel["scraped"], waiting up to
+    timeout seconds (never past the turn's deadline) for more. Returns True if anything landed.
+    """
+    pending = intel["pending"]
+    timeout = min(timeout, max(0.0, intel["deadline"] - time.time()))
+    if pending and timeout > 0:
+        concurrent.futures.wait(list(pending.values()), timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+
+    landed = False
+    for url, future in list(pending.items()):
+        if not future.done():
+            continue
+        del pending[url]
+        try:
+            intel["scraped"][url] = future.result()
+        except Exception:
+            intel["scraped"][url] = None
+        landed = True
+    intel["late"] = list(pending)
+    return landed
+
+def build_pool(intel, num_results=8):
+    """
+    Resolves gathered intelligence into a ranked list of distinct sources:
+    [{"title", "url", "domain", "status", "note", "content"}] plus the (dropped, kept) duplicate pairs.
+    'content' is the packed deep-read excerpt, or the snippet when no usable page exists.
+    """
+    final_query = intel["query"]
+    scraped_data = intel["scraped"]
+    late = set(intel["late"])
 
+    def body_of(res):
+        page = scraped_data.get(res.get("url"))
+        return page if page and not page.startswith("[System") else res.get("content", "")
+
+    # Content-level dedupe across snippets and scraped bodies; freed slots go to further distinct sources
+    sources, body_dupes = dedupe.unique(intel["results"], body_of, limit=num_results)
+    duplicates = list(intel.get("duplicates", [])) + [(d.get("url"), k.get("url")) for d, k in body_dupes]
+
+    pool = []
+    for res in sources:
+        url = res.get("url", "#")
+        snippet = res.get("content", "No snippet available.")
+        page = scraped_data.get(url)
+        note = ""
+
+        if page and not page.startswith("[System"):
+            status = "DEEP READ (TOP PASSAGES)"
+            content = passages.select_passages(page, final_query, TOKENS_PER_SOURCE)
+        elif url in late:
+            status = "LATE - SNIPPET ONLY (deep read still in progress)"
+            content = snippet
+        elif page:
+            status = "SNIPPET ONLY"
+            note = page  # Scraper diagnostic
+            content = snippet
+        else:
+            status = "SNIPPET ONLY"
+            content = snippet
+
+        pool.append({
+            "title": res.get("title", "No Title"),
+            "url": url,
+            "domain": urlsplit(url).hostname or url,
+            "status": status,
+            "note": note,
+            "content": content,
+        })
+    return pool, duplicates
+
+def format_report(intel, num_results=8):
+    """Turns gathered intelligence into the WEB INTELLIGENCE context block."""
+    final_query = intel["query"]
+    late = intel["late"]
+
+    if not intel["results"]:
+        return f"[System Log]: Search for '{final_query}' returned 0 results."
+
+    pool, duplicates = build_pool(intel, num_results)
+
+    context_str = f"--- BEGIN WEB INTELLIGENCE FOR: '{final_query}'{intel['note']} ---\n"
+    if duplicates:
+        context_str += f"DUPLICATES DROPPED: {', '.join(f'{d} (= {k})' for d, k in duplicates)}\n"
+    if late:
+        context_str += f"LATE SOURCES (snippet only, still being read): {', '.join(sorted(late))}\n"
+
+    for i, src in enumerate(pool):
+        context_str += f"\n=== SOURCE {i+1}: {src['title']} ===\n"
+        context_str += f"URL: {src['url']}\n"
+
+        note = f" {src['note']}" if src["note"] else ""
+        context_str += f"STATUS: [{src['status']}]{note}\n"
+        if src["status"].startswith("DEEP READ"):
+            context_str += f"--- START CONTENT ---\n{src['content']}\n--- END CONTENT ---\n"
+        else:
+            context_str += f"CONTENT: {src['content']}\n"
+
+        context_str += "-" * 40
+
+    context_str += "\n--- END WEB INTELLIGENCE ---\n"
+    return context_str
+
+def search(query, num_results=8, client=None, history=None, model="gemma3:27b"):
+    """
+    Main Entry Point: gathers web intelligence within SEARCH_BUDGET seconds
+    and combines everything into a context block.
+    """
+    try:
+        intel = gather(query, client=client, history=history, model=model)
+        return format_report(intel, num_results)
     except Exception as e:
-        return f"[System Error]: Web search subsystem failed. Reason: {e}"
\ No newline at end of file
+        return f"[System Error]: Web search subsystem failed. Reason: {e}"
@@ -6,7 +6,6 @@ import hashlib
 # --- MULTI-TENANT PATHING ---
 # Resolves to /opt/rabid-ui/user_data/workspaces on your Ubuntu host
 WORKSPACE_DIR = os.path.join(os.path.dirname(__file__), "..", "user_data", "workspaces")
-os.makedirs(WORKSPACE_DIR, exist_ok=True)
 
 DEFAULT_CONFIG = {
     "Default": {
@@ -73,6 +72,7 @@ def load(user_key):
 
 def save(user_key, data):
     """Saves a user's workspace file to the persistent volume."""
+    os.makedirs(WORKSPACE_DIR, exist_ok=True)
     path = get_path(user_key)
     with open(path, "w") as f:
         json.dump(data, f, indent=4)
@@ -0,0 +1,70 @@
+import os
+import re
+import subprocess
+import sys
+
+# 1. TARGETS
+# Every module app.py pulls in at startup, plus the heavy third-party deps that used to load eagerly.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_MODULES = [
+    "app_utils.db", "app_utils.sidebar", "app_utils.ui_layout", "app_utils.bridge",
+    "app_utils.extraction", "app_utils.consensus", "app_utils.auth", "app_utils.arena",
+    "app_utils.web_search", "app_utils.memory", "app_utils.telemetry", "app_utils.render_cache",
+    "app_utils.admin_ui", "app_utils.sidebar_utils.loaders",
+]
+HEAVY_DEPS = ["streamlit", "plotly.graph_objects", "pandas", "altair", "docker", "pytesseract", "PIL.Image", "ollama", "httpx"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+print("☢️ RabidUI: Cold-Start Import Benchmark")
+
+def measure(module):
+    """Imports one module in a fresh interpreter and returns (cumulative_us, top_children) or an error string."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"
+
+    # importtime prints children before their parent, one indent level (2 spaces) deeper
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_LINE.match(line)
+        if m:
+            entries.append((int(m.group(2)), len(m.group(3)), m.group(4)))
+
+    total = None
+    children = []
+    for idx in range(len(entries) - 1, -1, -1):
+        cumulative, depth, name = entries[idx]
+        if name != module:
+            continue
+        total = cumulative
+        for child_us, child_depth, child_name in reversed(entries[:idx]):
+            if child_depth <= depth:
+                break
+            if child_depth == depth + 2:
+                children.append((child_us, child_name))
+        break
+    children.sort(reverse=True)
+    return total, children[:3]
+
+def report(title, modules):
+    print(f"\n--- {title} ---")
+    rows = []
+    for module in modules:
+        total, detail = measure(module)
+        rows.append((total, module, detail))
+    rows.sort(key=lambda r: -(r[0] or 0))
+    for total, module, detail in rows:
+        if total is None:
+            print(f"❌ {module:<36} {detail}")
+            continue
+        heaviest = ", ".join(f"{name} {us / 1000:.0f}ms" for us, name in detail)
+        print(f"✅ {module:<36} {total / 1000:8.1f} ms   ({heaviest})")
+
+# 2. RUN
+report("App Modules", APP_MODULES)
+report("Heavy Dependencies", HEAVY_DEPS)
+print("\n🏁 Benchmark Complete.")
@@ -6,17 +6,21 @@ echo "☢️ Starting RabidUI Deep Refresh..."
 echo "📡 Reloading systemd daemons..."
 sudo systemctl daemon-reload
 
-# 2. Restart Ollama with open networking
+# 2. Ensure the scrape-cache lookup index exists
+echo "🗂️ Indexing scrapes.db..."
+sudo sqlite3 /opt/rabid-scrape/scrapes.db "CREATE INDEX IF NOT EXISTS idx_scrapes_url_ts ON scrapes(url, timestamp DESC);" || echo "⚠️ scrapes.db not indexed (sqlite3 missing or DB absent)"
+
+# 3. Restart Ollama with open networking
 echo "🧠 Restarting Ollama service..."
 sudo systemctl restart ollama.service
 
-# 3. Force-recreate the RabidUI container
+# 4. Force-recreate the RabidUI container
 echo "📦 Recycling Docker container..."
 sudo systemctl stop rabidui.service
 sudo docker rm -f rabidui
 sudo systemctl start rabidui.service
 
-# 4. Success check
+# 5. Success check
 echo "✅ Refresh Complete!"
 echo "📡 Tailing logs (Ctrl+C to exit)..."
 sudo journalctl -u rabidui.service -f
@@ -0,0 +1,187 @@
+# /opt/rabid-ui/scrape_daemon.py
+# Long-lived scrape worker. Run it with the rabid-scrape interpreter so Playwright is available:
+#   /opt/rabid-scrape/venv/bin/python /opt/rabid-ui/scrape_daemon.py
+import os
+import sys
+import signal
+import sqlite3
+import subprocess
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+from app_utils import scrape_queue, scrape_cache
+
+# --- CONFIGURATION ---
+SCRAPER_ROOT = "/opt/rabid-scrape"
+DB_PATH = os.path.join(SCRAPER_ROOT, "scrapes.db")
+PYTHON_EXEC = os.path.join(SCRAPER_ROOT, "venv/bin/python")
+MAIN_SCRIPT = os.path.join(SCRAPER_ROOT, "main.py")
+
+WORKERS = int(os.environ.get("RABID_SCRAPE_WORKERS", "3"))
+PAGE_TIMEOUT_MS = 15000
+MIN_TEXT_CHARS = 500         # Less than this from the warm browser -> hand over to the full engine (OCR etc.)
+PAGES_PER_CONTEXT = 50       # Recycle browser contexts to keep memory flat
+IDLE_SLEEP = 0.2
+HEARTBEAT_INTERVAL = 5.0     # Written from a side thread, so long full-engine jobs don't look like a dead daemon
+FULL_ENGINE_TIMEOUT = 120
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+stop_event = threading.Event()
+
+def log(msg):
+    print(f"[scrape-daemon] {time.strftime('%H:%M:%S')} {msg}", flush=True)
+
+_scrape_columns = None
+
+def scrape_columns():
+    """
+    Columns of rabid-scrape's scrapes table, read from the live schema (the engine owns it):
+    {name: (notnull, has_default)}. Raises if the table can't take a daemon row.
+    """
+    global _scrape_columns
+    if _scrape_columns is None:
+        with sqlite3.connect(DB_PATH, timeout=10) as conn:
+            info = conn.execute("PRAGMA table_info(scrapes)").fetchall()
+        columns = {row[1]: (bool(row[3]), row[4] is not None or bool(row[5])) for row in info}
+        missing = {"url", "content"} - set(columns)
+        required = {n for n, (notnull, has_default) in columns.items() if notnull and not has_default}
+        unknown = required - {"url", "content", "method", "timestamp"}
+        if missing or unknown:
+            raise RuntimeError(f"scrapes schema not writable by the daemon (missing {sorted(missing)}, required {sorted(unknown)})")
+        _scrape_columns = columns
+    return _scrape_columns
+
+def save_scrape(url, content, method="METHOD_DAEMON"):
+    """Writes a result into the shared scrapes.db so every reader sees it (only columns the schema has)."""
+    columns = scrape_columns()
+    names, values = ["url", "content"], [url, content]
+    if "method" in columns:
+        names.append("method")
+        values.append(method)
+    placeholders = ["?"] * len(names)
+    # Let the table's own default stamp the row when it has one; CURRENT_TIMESTAMP is what readers parse
+    if "timestamp" in columns and not columns["timestamp"][1]:
+        names.append("timestamp")
+        placeholders.append("CURRENT_TIMESTAMP")
+    with sqlite3.connect(DB_PATH, timeout=10) as conn:
+        conn.execute(
+            f"INSERT INTO scrapes ({', '.join(names)}) VALUES ({', '.join(placeholders)})",
+            values
+        )
+        conn.commit()
+
+def run_full_engine(url):
+    """Escalation path: the original Playwright/OCR engine, which writes its own row."""
+    subprocess.run(
+        [PYTHON_EXEC, MAIN_SCRIPT, url],
+        check=True,
+        cwd=SCRAPER_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=FULL_ENGINE_TIMEOUT
+    )
+
+def heartbeat_loop(name, done):
+    """Keeps a worker's heartbeat current while it is alive, including mid-job."""
+    while not (stop_event.is_set() or done.is_set()):
+        try:
+            scrape_queue.heartbeat(name)
+        except sqlite3.Error as e:
+            log(f"⚠️ Heartbeat failed for {name}: {e}")
+        stop_event.wait(HEARTBEAT_INTERVAL)
+
+def worker_loop(index):
+    """One worker = one warm browser, plus a side thread keeping its heartbeat fresh."""
+    name = scrape_queue.worker_name(index)
+    done = threading.Event()
+    threading.Thread(target=heartbeat_loop, args=(name, done), daemon=True).start()
+    try:
+        serve(name)
+    finally:
+        done.set()
+        scrape_queue.retire(name)
+
+def serve(name):
+    """Claims jobs until shutdown; pages are opened in a reused context."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context(user_agent=USER_AGENT)
+        pages_served = 0
+
+        while not stop_event.is_set():
+            job = scrape_queue.claim(name)
+            if not job:
+                stop_event.wait(IDLE_SLEEP)
+                continue
+
+            job_id, url = job
+            try:
+                text = None
+                page = context.new_page()
+                try:
+                    page.goto(url, timeout=PAGE_TIMEOUT_MS, wait_until="domcontentloaded")
+                    text = page.inner_text("body")
+                except Exception as e:
+                    # Timeouts and network errors in the warm browser are what the full engine is for
+                    log(f"↪️ {url}: warm browser failed ({str(e).splitlines()[0][:120]}), escalating")
+                finally:
+                    page.close()
+
+                saved = False
+                if text and len(text.strip()) >= MIN_TEXT_CHARS:
+                    try:
+                        save_scrape(url, text.strip())
+                        saved = True
+                    except (sqlite3.Error, RuntimeError) as e:
+                        log(f"⚠️ Could not save daemon scrape, escalating: {e}")
+                if not saved:
+                    run_full_engine(url)
+                scrape_queue.finish(job_id, ok=True)
+            except subprocess.CalledProcessError as e:
+                scrape_queue.finish(job_id, ok=False, error=e.stderr.decode(errors="ignore").strip()[:500])
+            except subprocess.TimeoutExpired:
+                scrape_queue.finish(job_id, ok=False, error=f"full engine timed out after {FULL_ENGINE_TIMEOUT}s")
+            except Exception as e:
+                scrape_queue.finish(job_id, ok=False, error=str(e)[:500])
+
+            pages_served += 1
+            if pages_served >= PAGES_PER_CONTEXT:
+                context.close()
+                context = browser.new_context(user_agent=USER_AGENT)
+                pages_served = 0
+
+        context.close()
+        browser.close()
+
+def main():
+    scrape_queue.init_queue()
+    try:
+        scrape_cache.ensure_index()
+    except sqlite3.Error as e:
+        log(f"⚠️ Could not create scrapes index: {e}")
+    try:
+        scrape_columns()
+    except (sqlite3.Error, RuntimeError) as e:
+        log(f"⚠️ Warm results can't be stored, every job will use the full engine: {e}")
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    threads = [threading.Thread(target=worker_loop, args=(i,), daemon=True) for i in range(WORKERS)]
+    for t in threads:
+        t.start()
+    log(f"☢️ {WORKERS} warm browser workers online (queue: {scrape_queue.QUEUE_DB})")
+
+    while not stop_event.is_set():
+        stop_event.wait(3600)
+        scrape_queue.prune()
+
+    for t in threads:
+        t.join(timeout=10)
+    log("🏁 Shutdown complete.")
+
+if __name__ == "__main__":
+    main()